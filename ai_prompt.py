@@ -0,0 +1,181 @@
+"""Prompt text for the AI PTO planner and the matching plain-text plan format."""
+import logging
+import math
+import os
+
+import pandas as pd
+
+from rto_core import PTO_SUBTRACTED
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the data sections (monthly table + holidays) of a prompt
+DEFAULT_TOKEN_BUDGET = int(os.environ.get('RTO_AI_PROMPT_TOKEN_BUDGET', 3000))
+# Rough characters per token for this kind of text, used when no tokenizer is at hand
+CHARS_PER_TOKEN = 3.5
+
+MONTHLY_COLUMNS = {
+    'Month': 'month',
+    'Work Days': 'work',
+    'PTO Days': 'pto',
+    'Net Work Days': 'net',
+    'Office Days Required': 'office',
+}
+
+
+def format_pto_plan(plan):
+    """Render an optimize_pto_plan result in the same layout as the AI suggestion."""
+    if not plan['pto_dates']:
+        return "No PTO days to place in this period."
+    longest = max(plan['breaks'], key=lambda b: b['Days Off'])
+    total_office_days = sum(row['Office Days Required'] for row in plan['monthly_data'])
+    lines = [
+        f"**Overall summary**: {len(plan['pto_dates'])} PTO days turn into {len(plan['breaks'])} breaks "
+        f"({sum(b['Days Off'] for b in plan['breaks'])} days off in total, the longest is {longest['Days Off']} days). "
+        f"Total required office days: {total_office_days:.1f}.",
+        "",
+        "PTO strategy by month:",
+    ]
+    for month, row in zip(plan['monthly_pto'], plan['monthly_data']):
+        dates = [date for date in plan['pto_dates'] if date.strftime('%Y-%m') == month]
+        if not dates:
+            continue
+        lines += [
+            f"- Month: {row['Month']}",
+            f"  - PTO Days: {row['PTO Days']:g}",
+            f"  - Total required office days: {row['Office Days Required']:g}",
+            f"  - Dates to take: {', '.join(date.strftime('%a %b %d') for date in dates)}",
+        ]
+    return "\n".join(lines)
+
+
+def required_office_days_formula(pto_accounting_policy, rto_percentage=60.0):
+    rate = f"{rto_percentage * 0.01:g}"
+    if pto_accounting_policy == PTO_SUBTRACTED:
+        formula = f"""
+        The formula of required office day is: [(Number of workday - PTO days) * {rate}], rounded down
+
+        For example, if there are 22 work days, and I take 10 PTO, then required office day is (22-10)*{rate} = {(22 - 10) * rto_percentage * 0.01:g}, rounded down to {math.floor((22 - 10) * rto_percentage * 0.01)} days
+        """
+    else:
+        formula = f"""
+        The formula of required office day is: [Number of workday * {rate}, rounded down - PTO days] \n
+        For example, if there are 22 work days, and I take 10 PTO, then required office day is {math.floor(22 * rto_percentage * 0.01)} - 10 = {math.floor(22 * rto_percentage * 0.01) - 10} days
+        """
+    return formula
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _number(value):
+    return f"{float(value):g}"
+
+
+def encode_table(rows, columns):
+    """CSV text of `rows` (list of dicts or DataFrame) with `columns` renamed to short headers."""
+    df = pd.DataFrame(rows, columns=list(columns))
+    lines = [",".join(columns.values())]
+    for record in df.itertuples(index=False):
+        lines.append(",".join(value if isinstance(value, str) else _number(value) for value in record))
+    return "\n".join(lines)
+
+
+def encode_holidays(holidays, compact=False):
+    """Holiday list as one line per holiday, or with `compact`, one line of day numbers per month.
+
+    `holidays` is the holiday_df from get_custom_holidays (names are used) or a Series of dates.
+    """
+    if isinstance(holidays, pd.DataFrame):
+        dates, names = pd.DatetimeIndex(holidays['Date']), list(holidays['Holiday Name'])
+    else:
+        dates, names = pd.DatetimeIndex(holidays), None
+    if compact or names is None:
+        days_by_month = {}
+        for date in dates.sort_values():
+            days_by_month.setdefault(date.strftime('%Y-%m'), []).append(str(date.day))
+        return "\n".join(f"{month}: {' '.join(days)}" for month, days in days_by_month.items())
+    return "\n".join(f"{date:%Y-%m-%d} {name}" for date, name in zip(dates, names))
+
+
+def encode_prompt_data(monthly_data, holidays, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Encode the monthly table and holidays, falling back to the compact holiday form over budget.
+
+    Nothing is ever dropped: if even the compact form is over budget it is used anyway and a warning logged.
+    """
+    monthly_text = encode_table(monthly_data, MONTHLY_COLUMNS)
+    holiday_text = encode_holidays(holidays)
+    if estimate_tokens(monthly_text + holiday_text) > token_budget:
+        holiday_text = encode_holidays(holidays, compact=True)
+        if estimate_tokens(monthly_text + holiday_text) > token_budget:
+            logger.warning("Prompt data is ~%d tokens, over the %d token budget",
+                           estimate_tokens(monthly_text + holiday_text), token_budget)
+    return monthly_text, holiday_text
+
+
+def build_precomputed_context(plan, lookup):
+    """Prompt section with a locally optimized plan and an office-day lookup table (see rto_core.office_day_lookup)."""
+    lookup_columns = {column: column for column in lookup.columns}
+    lookup_columns.update({'Month': 'month', 'Work Days': 'work', 'Planned PTO': 'planned'})
+    lookup_columns.update({column: column.replace('Office Days with ', '').replace(' PTO', '')
+                           for column in lookup.columns if column.startswith('Office Days with')})
+    return f"""
+        All required office day figures below are already calculated with the formula. Use them as they are,
+        do not recalculate them.
+
+        Candidate plan that minimizes office days and maximizes consecutive days off. Keep it unless my
+        additional criteria ask for something different:
+        {format_pto_plan(plan)}
+
+        Required office days per month with +0 to +{len(lookup.columns) - 4} PTO days on top of the planned PTO:
+        {encode_table(lookup, lookup_columns)}
+        """
+
+
+def build_ai_prompt(monthly_data, holidays, additional_info, pto_allowance, office_day_formula, precomputed=None,
+                    token_budget=DEFAULT_TOKEN_BUDGET):
+    monthly_text, holiday_text = encode_prompt_data(monthly_data, holidays, token_budget)
+    if precomputed is None:
+        calculation_instructions = f"""Use this formula and calculator tool to calculate the required office days:\n
+        {office_day_formula}"""
+    else:
+        calculation_instructions = f"""This is the formula of the required office days:\n
+        {office_day_formula}
+        {precomputed}"""
+    prompt = f"""
+        Use the monthly data and holidays to help me optimize my PTO plan.
+        I have a total {pto_allowance} number of PTO days to take in this period.
+
+        Focus on which month I should take PTO to minimize the total office days required.
+        Factor in weekends and company holidays to maximize day offs.
+        Do not suggest day offs between Christmas and New year since this is already a company holiday.
+        Also avoid suggesting taking day off for a whole week if I need to take Monday to Friday off using PTOs.
+
+        Here is the monthly data of how many work days, PTO days, net work days and office days required for each month (CSV):
+        {monthly_text}\n
+
+        Here are the company holidays during this period:
+        {holiday_text}\n
+
+        Here are additional criteria I want you to consider:
+        {additional_info}\n
+
+        {calculation_instructions}
+
+        Think carefully about my additional criteria, understand what it means before you give me suggestions.
+
+        Use this format for your suggestions:\n
+        **Overall summary**: \n
+        [summary of the strategy]
+
+        PTO strategy by month:
+        - Month: [Month]
+         - PTO Days: [Number of PTO Days]
+         - Total required office days: [Number of days to go into office subtracting the suggested PTO and holidays]
+         - Dates to take: [Dates to take PTO to maximize day offs including weekends and holidays, as YYYY-MM-DD
+           separated by commas, with runs of days as YYYY-MM-DD..YYYY-MM-DD]
+        """
+    logger.info("AI prompt: ~%d tokens (%d months, %d holidays, %s)", estimate_tokens(prompt), len(monthly_data),
+                len(holidays), "precomputed" if precomputed is not None else "calculator")
+    return prompt
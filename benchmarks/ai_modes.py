@@ -0,0 +1,71 @@
+"""Compare end-to-end latency and token spend of the AI chain modes.
+
+Runs the same planning request through the tool chain (two LLM calls plus the
+calculator) and the direct single-call chain with precomputed figures, bypassing
+the response cache, and prints median latency, time to first token and tokens
+per request. Needs ANTHROPIC_API_KEY in .streamlit/secrets.toml and makes paid calls.
+
+    python benchmarks/ai_modes.py --runs 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import uuid
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai_prompt import build_ai_prompt, build_precomputed_context, required_office_days_formula  # noqa: E402
+from math_tool import DIRECT_MODE, TOOL_MODE, request_stats, stream_calculator_tool  # noqa: E402
+from pto_optimizer import optimize_pto_plan  # noqa: E402
+from rto_core import (PTO_SUBTRACTED, build_monthly_data, calculate_monthly_workdays,  # noqa: E402
+                      get_custom_holidays, office_day_lookup)
+
+START, END = pd.Timestamp('2025-01-01'), pd.Timestamp('2025-12-31')
+RTO_PERCENTAGE = 60.0
+PTO_ALLOWANCE = 15
+CRITERIA = "I want to take 2 weeks off in July"
+
+
+def build_prompts():
+    monthly_workdays = calculate_monthly_workdays(START, END, True)
+    monthly_data = build_monthly_data(monthly_workdays, 0.0, RTO_PERCENTAGE, PTO_SUBTRACTED)
+    holidays = get_custom_holidays(START, END, True)['holiday_df']
+    additional_info = f"Total PTO I want to take: {PTO_ALLOWANCE}\n\nAdditional criteria: {CRITERIA}"
+    formula = required_office_days_formula(PTO_SUBTRACTED, RTO_PERCENTAGE)
+
+    plan = optimize_pto_plan(START, END, PTO_ALLOWANCE, RTO_PERCENTAGE, PTO_SUBTRACTED, True)
+    lookup = office_day_lookup(monthly_workdays, RTO_PERCENTAGE, PTO_SUBTRACTED)
+    precomputed = build_precomputed_context(plan, lookup)
+    return {
+        TOOL_MODE: build_ai_prompt(monthly_data, holidays, additional_info, PTO_ALLOWANCE, formula),
+        DIRECT_MODE: build_ai_prompt(monthly_data, holidays, additional_info, PTO_ALLOWANCE, formula, precomputed),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="Requests per mode")
+    args = parser.parse_args(argv)
+
+    summary = {}
+    for mode, prompt in build_prompts().items():
+        for _ in range(args.runs):
+            # A fresh key per run so every request really goes to the model
+            for _ in stream_calculator_tool(prompt, cache_key=uuid.uuid4().hex, mode=mode):
+                pass
+        runs = [stats for stats in request_stats if stats['mode'] == mode][-args.runs:]
+        summary[mode] = {key: statistics.median(run[key] for run in runs)
+                         for key in ('seconds', 'first_token_seconds', 'llm_calls', 'input_tokens', 'output_tokens')}
+        print(f"{mode:7s} " + "  ".join(f"{key}={value:.2f}" for key, value in summary[mode].items()))
+
+    tool, direct = summary[TOOL_MODE], summary[DIRECT_MODE]
+    print(f"direct/tool latency: {direct['seconds'] / tool['seconds']:.2f}  "
+          f"tokens: {(direct['input_tokens'] + direct['output_tokens']) / (tool['input_tokens'] + tool['output_tokens']):.2f}")
+
+
+if __name__ == '__main__':
+    main()
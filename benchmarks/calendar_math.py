@@ -0,0 +1,154 @@
+"""Benchmark suite for the calendar math in rto_core.
+
+Covers date ranges from one month to 30 years, both PTO accounting policies and
+many PTO vectors. Each case's best time is compared against the stored
+baseline in benchmarks/calendar_math_baseline.json; the script exits non-zero
+when any case is slower than baseline * (1 + tolerance) + MIN_SLACK_SECONDS.
+
+    python benchmarks/calendar_math.py              # compare against the baseline
+    python benchmarks/calendar_math.py --update     # re-record the baseline
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from calendars import load_year  # noqa: E402
+from rto_core import (PTO_ACCOUNTING_POLICIES, _monthly_row, build_monthly_data,  # noqa: E402
+                      calculate_monthly_workdays, calculate_office_days, calculate_workdays, get_custom_holidays,
+                      get_day_calendar, get_year_holidays, period_table)
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'calendar_math_baseline.json')
+
+RANGES = {
+    '1m': ('2025-03-01', '2025-03-31'),
+    '1y': ('2025-01-01', '2025-12-31'),
+    '5y': ('2021-01-01', '2025-12-31'),
+    '30y': ('1996-01-01', '2025-12-31'),
+}
+N_PTO_VECTORS = 1000
+# Sub-millisecond cases are dominated by timer noise, so allow this much on top of the tolerance
+MIN_SLACK_SECONDS = 0.0005
+
+
+def timed(func, repeat):
+    """Best wall-clock seconds of `repeat` calls (least affected by other load on the machine)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+
+def cold(func):
+    """Run func with the in-memory holiday and day calendar caches emptied first.
+
+    The compiled per-year holiday files on disk stay, as they would between app restarts.
+    """
+    def run():
+        load_year.cache_clear()
+        get_year_holidays.cache_clear()
+        get_day_calendar.cache_clear()
+        func()
+    return run
+
+
+def cold_rows(func):
+    """Run func with build_monthly_data's per-row cache emptied first (inputs it hasn't seen)."""
+    def run():
+        _monthly_row.cache_clear()
+        func()
+    return run
+
+
+def one_month_edit(monthly_pto):
+    """Return a function giving `monthly_pto` with one month set to a new value on every call (a single UI edit)."""
+    edits = itertools.count(1)
+    first_month = next(iter(monthly_pto))
+
+    def edit():
+        return {**monthly_pto, first_month: next(edits) * 0.5}
+    return edit
+
+
+def cases():
+    rng = np.random.default_rng(0)
+    for range_name, (start, end) in RANGES.items():
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        monthly_workdays = calculate_monthly_workdays(start, end, True)
+        workdays = np.array(list(monthly_workdays.values()), dtype=float)
+        pto_vectors = rng.integers(0, 15, size=(N_PTO_VECTORS, len(workdays))) * 0.5
+        monthly_pto = dict(zip(monthly_workdays, pto_vectors[0]))
+        calendar = get_day_calendar(start, end, True)
+        query_starts = start + pd.to_timedelta(rng.integers(0, len(calendar.days), N_PTO_VECTORS), unit='D')
+        query_ends = query_starts + pd.to_timedelta(rng.integers(0, 365, N_PTO_VECTORS), unit='D')
+
+        yield f'holidays/{range_name}/cold', cold(lambda: get_custom_holidays(start, end, True))
+        yield f'holidays/{range_name}/warm', lambda: get_custom_holidays(start, end, True)
+        yield f'workdays/{range_name}', lambda: calculate_workdays(start, end, True)
+        yield f'monthly_workdays/{range_name}/cold', cold(lambda: calculate_monthly_workdays(start, end, True))
+        yield f'monthly_workdays/{range_name}/warm', lambda: calculate_monthly_workdays(start, end, True)
+        yield f'calendar/{range_name}/with_pto', lambda: calendar.with_pto(monthly_pto=monthly_pto)
+        yield (f'calendar/{range_name}/range_queries/x{N_PTO_VECTORS}',
+               lambda: calendar.workdays(query_starts, query_ends))
+        yield f'calendar/{range_name}/rolling_12w', lambda: period_table(calendar, '12W', 60.0, PTO_ACCOUNTING_POLICIES[0])
+        for policy in PTO_ACCOUNTING_POLICIES:
+            policy_name = 'subtracted' if policy == PTO_ACCOUNTING_POLICIES[0] else 'as_office_day'
+            yield (f'monthly_data/{range_name}/{policy_name}/cold',
+                   cold_rows(lambda policy=policy: build_monthly_data(monthly_workdays, monthly_pto, 60.0, policy)))
+            yield (f'monthly_data/{range_name}/{policy_name}/warm',
+                   lambda policy=policy: build_monthly_data(monthly_workdays, monthly_pto, 60.0, policy))
+            yield (f'monthly_data/{range_name}/{policy_name}/one_month_edit',
+                   lambda policy=policy, edit=one_month_edit(monthly_pto): build_monthly_data(
+                       monthly_workdays, edit(), 60.0, policy))
+            yield (f'office_days/{range_name}/{policy_name}/x{N_PTO_VECTORS}',
+                   lambda policy=policy: calculate_office_days(workdays[None, :], pto_vectors, 60.0, policy))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--update', action='store_true', help="Record the results as the new baseline")
+    parser.add_argument('--repeat', type=int, default=15, help="Runs per case")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="Allowed slowdown over baseline before failing (0.5 = 50%%)")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH) and not args.update:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, func in cases():
+        func()  # warm up imports and caches that are meant to be warm
+        results[name] = timed(func, args.repeat)
+        line = f"{name:45s} {results[name] * 1000:9.3f} ms"
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += f"   x{ratio:.2f} vs baseline"
+            if results[name] > baseline[name] * (1 + args.tolerance) + MIN_SLACK_SECONDS:
+                line += "   REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.update:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) regressed: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
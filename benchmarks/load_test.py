@@ -0,0 +1,122 @@
+"""Load test for the JSON API in rto_api.py.
+
+Starts the API in-process on a free port (or targets --url) and sends a mix of
+requests from concurrent keep-alive clients, then reports throughput and
+p50/p99 latency per endpoint and overall:
+
+    python benchmarks/load_test.py --clients 16 --requests 5000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --unique 1.0
+
+--unique is the share of /office-days requests with a random RTO % and PTO, so
+they miss the response cache and go through the coalesced computation.
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Share of each endpoint in the request mix
+MIX = {'/office-days': 0.7, '/monthly-workdays': 0.1, '/holidays': 0.1, '/scenarios': 0.1}
+RANGES = [('2025-01-01', '2025-12-31'), ('2025-07-01', '2026-06-30'), ('2024-01-01', '2026-12-31')]
+SCENARIOS_PER_BULK = 100
+
+
+def make_body(path, rng, unique):
+    start_date, end_date = RANGES[rng.integers(len(RANGES))]
+    body = {'start_date': start_date, 'end_date': end_date}
+    if path == '/office-days':
+        if rng.random() < unique:
+            body.update(rto_percentage=float(rng.integers(0, 101)), avg_pto=float(rng.integers(0, 8)) * 0.5)
+        else:
+            body.update(rto_percentage=60, avg_pto=1)
+    elif path == '/scenarios':
+        body = {'scenarios': [{'employee_id': i, 'start_date': start_date, 'end_date': end_date,
+                               'rto_percentage': float(rng.integers(0, 101)), 'avg_pto': float(rng.integers(0, 5))}
+                              for i in range(SCENARIOS_PER_BULK)]}
+    return json.dumps(body)
+
+
+def client(host, port, paths, bodies, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    for path, body in zip(paths, bodies):
+        start = time.perf_counter()
+        try:
+            connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors[path] += 1
+        except (OSError, http.client.HTTPException):
+            errors[path] += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies[path].append(time.perf_counter() - start)
+    connection.close()
+
+
+def report(name, samples, seconds, errors=0):
+    samples = np.array(samples) * 1000
+    p50, p99 = np.percentile(samples, [50, 99]) if len(samples) else (np.nan, np.nan)
+    print(f"{name:20s} {len(samples):8d} {len(samples) / seconds:10.1f} {p50:9.2f} {p99:9.2f} {errors:7d}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="API to test (default: start one in-process)")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent connections")
+    parser.add_argument('--requests', type=int, default=5000, help="Total requests")
+    parser.add_argument('--unique', type=float, default=0.5,
+                        help="Share of /office-days requests with random inputs (cache misses)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from rto_api import make_server
+
+        server = make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+    rng = np.random.default_rng(args.seed)
+    paths = rng.choice(list(MIX), size=args.requests, p=list(MIX.values()))
+    bodies = [make_body(path, rng, args.unique) for path in paths]
+    latencies, errors = defaultdict(list), defaultdict(int)
+    threads = [threading.Thread(target=client, args=(host, port, paths[i::args.clients], bodies[i::args.clients],
+                                                     latencies, errors))
+               for i in range(args.clients)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    print(f"{args.requests} requests from {args.clients} clients in {seconds:.2f} s")
+    print(f"{'endpoint':20s} {'requests':>8s} {'req/s':>10s} {'p50 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for path in MIX:
+        report(path, latencies[path], seconds, errors[path])
+    report('all', [sample for samples in latencies.values() for sample in samples], seconds, sum(errors.values()))
+    if server is not None:
+        server.shutdown()
+    if sum(errors.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Measure cold-start cost of the app modules.
+
+Each measurement runs in a fresh interpreter and reports wall-clock import time
+and peak RSS. Results are appended to benchmarks/startup_results.json under the
+given label, so runs on two commits can be compared:
+
+    git checkout <old> && python benchmarks/startup.py --label before
+    git checkout <new> && python benchmarks/startup.py --label after
+    python benchmarks/startup.py --compare before after
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, 'benchmarks', 'startup_results.json')
+
+SNIPPETS = {
+    'import rto_core': 'import rto_core',
+    'import math_tool': 'import math_tool',
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec({snippet!r})
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss_kb //= 1024
+print(json.dumps({{'seconds': elapsed, 'rss_mb': rss_kb / 1024}}))
+"""
+
+
+def measure(snippet, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(snippet=snippet)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    runs.sort(key=lambda run: run['seconds'])
+    return runs[len(runs) // 2]  # median run
+
+
+def load_results():
+    if os.path.exists(RESULTS_PATH):
+        with open(RESULTS_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--label', default='current', help="Name to store this run under")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Print two stored runs side by side")
+    args = parser.parse_args(argv)
+
+    results = load_results()
+    if args.compare:
+        base, new = (results[label] for label in args.compare)
+        for name in base:
+            if name in new:
+                print(f"{name:20s} {base[name]['seconds'] * 1000:8.1f} ms -> {new[name]['seconds'] * 1000:8.1f} ms   "
+                      f"{base[name]['rss_mb']:7.1f} MB -> {new[name]['rss_mb']:7.1f} MB")
+        return
+
+    run = {}
+    for name, snippet in SNIPPETS.items():
+        try:
+            run[name] = measure(snippet, args.repeat)
+        except subprocess.CalledProcessError as exc:
+            print(f"{name}: failed\n{exc.stderr}", file=sys.stderr)
+            continue
+        print(f"{name:20s} {run[name]['seconds'] * 1000:8.1f} ms {run[name]['rss_mb']:7.1f} MB")
+
+    results[args.label] = run
+    with open(RESULTS_PATH, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
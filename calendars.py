@@ -0,0 +1,201 @@
+"""Pluggable holiday calendars, compiled once per year into memory-mappable arrays.
+
+A calendar source is one of
+
+- a country or country-subdivision from the `holidays` package ("GB", "US-CA"),
+- the default "US (company)" calendar: US federal holidays plus the day after
+  Thanksgiving,
+- a company calendar file (CSV with Date and Holiday Name columns, or ICS)
+  dropped into RTO_CALENDAR_DIR (default `calendars/`).
+
+The first time a (calendar, year) is needed its holidays are generated and
+saved under RTO_CALENDAR_CACHE (default `.cache/calendars`) as two .npy files:
+the sorted dates as datetime64[D] and the matching names. Later loads, also
+from other processes, memory-map those files instead of running the
+`holidays` package again. The cache directory name includes a fingerprint of
+the source (package version, or the file's contents), so a changed source is
+recompiled by the next process that loads it. Within a running process the
+calendar list and loaded years are cached in memory, so a new or edited
+calendar file is only picked up after a restart.
+
+The Christmas break is not part of a calendar; rto_core adds it on top of any
+calendar when the user asks for it.
+"""
+import csv
+import hashlib
+import os
+import re
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_CALENDAR = 'US (company)'
+CALENDAR_DIR = os.environ.get('RTO_CALENDAR_DIR', 'calendars')
+CACHE_DIR = os.environ.get('RTO_CALENDAR_CACHE', os.path.join('.cache', 'calendars'))
+# Regions offered in the app besides the default and the calendar files
+DEFAULT_REGIONS = os.environ.get('RTO_HOLIDAY_REGIONS', 'US-CA,US-NY,US-TX,US-WA,CA,GB,IE,DE,FR,IN')
+
+
+@lru_cache(maxsize=1)
+def _holidays_version():
+    """Identifies the installed `holidays` package without importing it (which is what we're avoiding)."""
+    from importlib.util import find_spec
+
+    origin = find_spec('holidays').origin
+    return f"{origin}:{os.stat(origin).st_mtime_ns}"
+
+
+class HolidaysPackageSource:
+    """Holidays of a country (optionally a subdivision) from the `holidays` package."""
+
+    def __init__(self, country, subdivision=None, day_after_thanksgiving=False):
+        self.country = country
+        self.subdivision = subdivision
+        self.day_after_thanksgiving = day_after_thanksgiving
+
+    def fingerprint(self):
+        return f"{self.country}-{self.subdivision or ''}-{int(self.day_after_thanksgiving)}-{_holidays_version()}"
+
+    def year(self, year):
+        import holidays as hd
+
+        holiday_names = dict(hd.country_holidays(self.country, subdiv=self.subdivision, years=year).items())
+        if self.day_after_thanksgiving:
+            # Thanksgiving is the 4th Thursday of November
+            first = date(year, 11, 1)
+            thanksgiving = first + timedelta(days=(3 - first.weekday()) % 7 + 21)
+            holiday_names.setdefault(thanksgiving + timedelta(days=1), "Day After Thanksgiving")
+        return holiday_names
+
+
+class FileSource:
+    """Company calendar from a CSV (Date, Holiday Name) or ICS file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fingerprint(self):
+        with open(self.path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:16]
+
+    def year(self, year):
+        return {day: name for day, name in self._holidays(self.fingerprint()).items() if day.year == year}
+
+    @lru_cache(maxsize=4)
+    def _holidays(self, _fingerprint):
+        if self.path.lower().endswith('.ics'):
+            return read_ics(self.path)
+        return read_csv(self.path)
+
+
+def read_csv(path):
+    """{date: name} from a CSV with a date column and an optional name column (header names are flexible)."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return {}
+    columns = {column.strip().lower(): column for column in rows[0]}
+    date_column = columns.get('date') or next(iter(rows[0]))
+    name_column = columns.get('holiday name') or columns.get('name') or columns.get('holiday')
+    return {date.fromisoformat(row[date_column].strip()[:10]): (row[name_column].strip() if name_column else "Holiday")
+            for row in rows if row[date_column].strip()}
+
+
+def _ics_date(value):
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def read_ics(path, recurring_years=range(2000, 2051)):
+    """{date: name} from the all-day VEVENTs of an ICS file.
+
+    Multi-day events are expanded (DTEND is exclusive). Simple yearly recurrences
+    (RRULE:FREQ=YEARLY without BY* parts) are repeated for `recurring_years`;
+    other recurrence rules are not supported and only their first date is used.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        text = re.sub(r'\r?\n[ \t]', '', f.read())  # unfold continuation lines
+    holiday_names = {}
+    for event in re.findall(r'BEGIN:VEVENT(.*?)END:VEVENT', text, flags=re.S):
+        fields = {}
+        for line in event.strip().splitlines():
+            key, _, value = line.partition(':')
+            fields.setdefault(key.split(';')[0].upper(), value.strip())
+        if 'DTSTART' not in fields:
+            continue
+        start = _ics_date(fields['DTSTART'])
+        end = _ics_date(fields['DTEND']) if 'DTEND' in fields else start + timedelta(days=1)
+        name = fields.get('SUMMARY', 'Holiday').replace('\\,', ',')
+        days = [start + timedelta(days=i) for i in range(max((end - start).days, 1))]
+        rule = fields.get('RRULE', '')
+        if 'FREQ=YEARLY' in rule and 'BY' not in rule:
+            days = [day.replace(year=year) for day in days for year in recurring_years
+                    if year >= day.year and not (day.month == 2 and day.day == 29)]
+        for day in days:
+            holiday_names.setdefault(day, name)
+    return holiday_names
+
+
+@lru_cache(maxsize=1)
+def available_calendars():
+    """{name: source} of every calendar that can be selected, the default first."""
+    sources = {DEFAULT_CALENDAR: HolidaysPackageSource('US', day_after_thanksgiving=True)}
+    for region in filter(None, (region.strip() for region in DEFAULT_REGIONS.split(','))):
+        country, _, subdivision = region.partition('-')
+        sources[region] = HolidaysPackageSource(country, subdivision or None)
+    if os.path.isdir(CALENDAR_DIR):
+        for filename in sorted(os.listdir(CALENDAR_DIR)):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() in ('.csv', '.ics'):
+                sources[f"{stem} (company)"] = FileSource(os.path.join(CALENDAR_DIR, filename))
+    return sources
+
+
+def get_source(calendar):
+    sources = available_calendars()
+    if calendar not in sources:
+        raise ValueError(f"unknown holiday calendar {calendar!r}; choose from {', '.join(sources)}")
+    return sources[calendar]
+
+
+def _artifact_dir(calendar, source):
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', calendar).strip('-').lower()
+    return os.path.join(CACHE_DIR, f"{slug}-{hashlib.sha1(source.fingerprint().encode()).hexdigest()[:12]}")
+
+
+def compile_year(calendar, year):
+    """Generate one year of `calendar` and save it as sorted dates + names .npy files; returns their paths."""
+    source = get_source(calendar)
+    directory = _artifact_dir(calendar, source)
+    os.makedirs(directory, exist_ok=True)
+    holiday_names = sorted(source.year(year).items())
+    dates = np.array([day for day, _ in holiday_names], dtype='datetime64[D]')
+    names = np.array([name for _, name in holiday_names], dtype=str)
+    paths = os.path.join(directory, f"{year}.dates.npy"), os.path.join(directory, f"{year}.names.npy")
+    # Write under temporary names (unique per process and thread) so a concurrent reader never maps a
+    # half-written file and concurrent writers don't move each other's files away
+    for path, values in zip(paths, (dates, names)):
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values)
+        os.replace(tmp_path, path)
+    return paths
+
+
+@lru_cache(maxsize=256)
+def load_year(calendar, year):
+    """(dates, names) of one year of `calendar`: read-only datetime64[D] and str arrays, sorted by date."""
+    source = get_source(calendar)
+    directory = _artifact_dir(calendar, source)
+    paths = os.path.join(directory, f"{year}.dates.npy"), os.path.join(directory, f"{year}.names.npy")
+    if not all(os.path.exists(path) for path in paths):
+        paths = compile_year(calendar, year)
+    return tuple(_load_array(path) for path in paths)
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:  # an empty array can't be memory-mapped
+        return np.load(path)
@@ -0,0 +1,138 @@
+"""Plotly figures for the app, built from plain data so they can be cached on it.
+
+Long ranges are aggregated before plotting: the office-days bar chart switches
+from months to quarters to years as the range grows, and the day-level
+calendar heatmap sends one small integer per day plus a short hover label,
+laid out as one GitHub-style weeks x weekdays grid per year.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from calendars import DEFAULT_CALENDAR
+from occupancy import OccupancyCalendar
+from rto_core import COMPANY_BREAK, HOLIDAY, WEEKEND, calculate_office_days
+
+# Bar chart granularity by number of months shown
+GRANULARITY_LIMITS = [(24, 'Month'), (96, 'Quarter'), (None, 'Year')]
+
+# Heatmap categories in code order, with their colours
+DAY_CATEGORIES = [
+    ('Remote workday', '#c6dbef'),
+    ('Office day', '#2171b5'),
+    ('PTO', '#41ab5d'),
+    ('Holiday', '#fd8d3c'),
+    ('Christmas break', '#e6550d'),
+    ('Weekend', '#f0f0f0'),
+]
+REMOTE, OFFICE, PTO_DAY, HOLIDAY_DAY, BREAK_DAY, WEEKEND_DAY = range(len(DAY_CATEGORIES))
+WEEKDAY_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Years drawn in one heatmap; longer ranges are shown a window at a time
+MAX_HEATMAP_YEARS = 10
+
+
+def auto_granularity(n_months):
+    for limit, granularity in GRANULARITY_LIMITS:
+        if limit is None or n_months <= limit:
+            return granularity
+
+
+def aggregate_monthly_data(monthly_data, months, granularity):
+    """Monthly table rows summed per 'Month', 'Quarter' or 'Year' (keys are the 'YYYY-MM' months)."""
+    df = pd.DataFrame(monthly_data)
+    if granularity == 'Month':
+        return df
+    periods = pd.PeriodIndex(months, freq='M').asfreq('Q' if granularity == 'Quarter' else 'Y')
+    labels = [f"Q{p.quarter} {p.year}" for p in periods] if granularity == 'Quarter' else [str(p.year) for p in periods]
+    df = df.drop(columns='Month').groupby(pd.Index(labels, name=granularity), sort=False).sum()
+    return df.reset_index()
+
+
+def monthly_chart(monthly_data, months, granularity='Auto'):
+    """Grouped bars of required office days vs PTO, per month, quarter or year."""
+    if granularity == 'Auto':
+        granularity = auto_granularity(len(months))
+    df = aggregate_monthly_data(monthly_data, months, granularity)
+    fig = go.Figure([go.Bar(x=df[granularity], y=df[column], name=column)
+                     for column in ('Office Days Required', 'PTO Days')])
+    fig.update_layout(
+        title=f'{"Monthly" if granularity == "Month" else granularity + "ly"} Office Days Required vs PTO',
+        barmode='group',
+        xaxis_title=granularity,
+        yaxis_title="Days",
+        legend_title="Category",
+        height=500,
+    )
+    return fig
+
+
+def day_categories(months, extended_christmas_break, monthly_pto, rto_percentage, pto_accounting_policy,
+                   calendar=DEFAULT_CALENDAR):
+    """(days, category code per day) for the months' date range.
+
+    Weekends, holidays and the Christmas break come from the holiday calendar.
+    Each month's office days and PTO are counts, not dates, so they are shown
+    as one example placement: office days spread evenly over the month's
+    workdays, PTO on the workdays that spreading would use last.
+    """
+    start = pd.Timestamp(months[0] + "-01")
+    end = pd.Timestamp(months[-1] + "-01") + pd.offsets.MonthEnd(0)
+    occupancy = OccupancyCalendar(start, end, extended_christmas_break, calendar)
+    flags = occupancy.calendar.flags
+    workdays = occupancy.workdays
+    pto = np.array([monthly_pto.get(month, 0.0) for month in occupancy.month_keys], dtype=float)
+    _, office = calculate_office_days(workdays, pto, rto_percentage, pto_accounting_policy)
+    pto_days = np.minimum(np.ceil(pto), workdays)
+    office = np.clip(np.ceil(office), 0, workdays - pto_days)
+
+    month_ids = occupancy.month_ids
+    ranks = occupancy.ranks(())
+    categories = np.full(len(flags), REMOTE, dtype=np.int8)
+    categories[ranks < office[month_ids]] = OFFICE
+    categories[(ranks < workdays[month_ids]) & (ranks >= (workdays - pto_days)[month_ids])] = PTO_DAY
+    categories[(flags & WEEKEND) > 0] = WEEKEND_DAY
+    categories[(flags & COMPANY_BREAK) > 0] = BREAK_DAY
+    categories[(flags & HOLIDAY) > 0] = HOLIDAY_DAY
+    return occupancy.days, categories
+
+
+def calendar_heatmap(days, categories, years=None):
+    """GitHub-style calendar: one row of weeks x weekdays per year, coloured by day category.
+
+    `years` limits the figure to those years (default: all, at most MAX_HEATMAP_YEARS should be passed).
+    """
+    days = pd.DatetimeIndex(days)
+    years = sorted(set(days.year) if years is None else years)
+    n = len(DAY_CATEGORIES)
+    colorscale = [[stop, color] for i, (_, color) in enumerate(DAY_CATEGORIES) for stop in (i / n, (i + 1) / n)]
+    names = np.array([name for name, _ in DAY_CATEGORIES])
+
+    fig = make_subplots(rows=len(years), cols=1, subplot_titles=[str(year) for year in years],
+                        vertical_spacing=min(0.08, 0.3 / len(years)))
+    for row, year in enumerate(years, start=1):
+        in_year = days.year == year
+        year_days = days[in_year]
+        # Week column counted from the Monday on or before Jan 1
+        jan1_weekday = pd.Timestamp(year=year, month=1, day=1).weekday()
+        week = (year_days.dayofyear - 1 + jan1_weekday) // 7
+        weekday = year_days.weekday
+        z = np.full((7, 54), np.nan, dtype=np.float32)
+        z[weekday, week] = categories[in_year]
+        hover = np.full((7, 54), '', dtype=object)
+        # The weekday is on the y axis already, so the hover label is kept to date and category
+        hover[weekday, week] = [f"{day:%b %d}: {name}" for day, name in zip(year_days, names[categories[in_year]])]
+        fig.add_trace(go.Heatmap(z=z, customdata=hover, hovertemplate="%{customdata}<extra></extra>",
+                                 colorscale=colorscale, zmin=-0.5, zmax=n - 0.5, showscale=False,
+                                 xgap=2, ygap=2), row=row, col=1)
+        fig.update_yaxes(tickvals=list(range(7)), ticktext=WEEKDAY_LABELS, autorange='reversed',
+                         showgrid=False, row=row, col=1)
+        fig.update_xaxes(visible=False, row=row, col=1)
+
+    # Legend entries only; the heatmaps themselves have no legend
+    for name, color in DAY_CATEGORIES:
+        fig.add_trace(go.Scatter(x=[None], y=[None], mode='markers', name=name,
+                                 marker=dict(symbol='square', size=12, color=color)))
+    fig.update_layout(height=80 + 170 * len(years), legend=dict(orientation='h', y=1.0, yanchor='bottom'),
+                      plot_bgcolor='white', margin=dict(t=60, b=20))
+    return fig
@@ -0,0 +1,146 @@
+"""Process-wide runtime for LLM requests.
+
+Every request runs on one background event loop, so the model client and its
+HTTP connection pool are shared by all sessions instead of being tied to a
+throwaway loop per click. At most `max_concurrency` requests are in flight;
+up to `max_waiting` more wait their turn in FIFO order, and anything beyond
+that is turned away at once with QueueFullError rather than piling up.
+
+Each request gets `timeout_seconds` once it has a slot (queue time excluded),
+and provider rate-limit errors (HTTP 429) are retried with exponential backoff
+and full jitter, honouring a retry-after header when the provider sends one.
+"""
+import asyncio
+import logging
+import random
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Too many requests are already waiting; the caller should try again later."""
+
+
+def is_rate_limit_error(exc):
+    return getattr(exc, 'status_code', None) == 429 or type(exc).__name__ == 'RateLimitError'
+
+
+def _retry_after(exc):
+    """Seconds from the retry-after header of a provider error, if any."""
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_delay(attempt, backoff_seconds, max_backoff_seconds, retry_after=None):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    delay = random.uniform(0, min(max_backoff_seconds, backoff_seconds * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_backoff_seconds))
+    return delay
+
+
+class LLMRuntime:
+    """Background event loop with a bounded, FIFO pool of request slots."""
+
+    def __init__(self, max_concurrency=4, max_waiting=16, timeout_seconds=120.0, max_retries=3,
+                 backoff_seconds=1.0, max_backoff_seconds=20.0):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        # Only touched on the loop thread
+        self._active = 0
+        self._waiters = deque()  # (future, on_queue) in arrival order
+        # Admission control happens on the caller's thread
+        self._lock = threading.Lock()
+        self._pending = 0
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-runtime', daemon=True)
+        self._thread.start()
+
+    def submit(self, coro_factory, on_queue=None):
+        """Run `coro_factory()` on the runtime loop once a slot is free; returns a concurrent.futures.Future.
+
+        `on_queue` is called (on the loop thread) with the 1-based queue position
+        whenever the request has to wait and each time that position changes.
+        Cancelling the future cancels the request, whether it is queued or running.
+        """
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_waiting:
+                raise QueueFullError(f"{self._pending} AI requests are already running or waiting")
+            self._pending += 1
+        future = asyncio.run_coroutine_threadsafe(self._run(coro_factory, on_queue), self.loop)
+        future.add_done_callback(self._done)
+        return future
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+        return {'running': min(pending, self.max_concurrency),
+                'waiting': max(pending - self.max_concurrency, 0),
+                'max_concurrency': self.max_concurrency,
+                'max_waiting': self.max_waiting}
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, coro_factory, on_queue):
+        await self._acquire(on_queue)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await asyncio.wait_for(coro_factory(), self.timeout_seconds)
+                except Exception as exc:
+                    if attempt == self.max_retries or not is_rate_limit_error(exc):
+                        raise
+                    delay = retry_delay(attempt, self.backoff_seconds, self.max_backoff_seconds, _retry_after(exc))
+                    logger.warning("AI request rate limited, retry %d/%d in %.1fs", attempt + 1, self.max_retries,
+                                   delay)
+                    await asyncio.sleep(delay)
+        finally:
+            self._release()
+
+    async def _acquire(self, on_queue):
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+        slot = self.loop.create_future()
+        self._waiters.append((slot, on_queue))
+        if on_queue is not None:
+            on_queue(len(self._waiters))
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self._release()  # the slot was handed over just as we were cancelled
+            else:
+                self._remove_waiter(slot)
+            raise
+
+    def _release(self):
+        self._active -= 1
+        while self._waiters and self._active < self.max_concurrency:
+            slot, _ = self._waiters.popleft()
+            if not slot.done():
+                self._active += 1
+                slot.set_result(None)
+        self._notify_positions()
+
+    def _remove_waiter(self, slot):
+        self._waiters = deque(waiter for waiter in self._waiters if waiter[0] is not slot)
+        self._notify_positions()
+
+    def _notify_positions(self):
+        for position, (_, on_queue) in enumerate(self._waiters, start=1):
+            if on_queue is not None:
+                on_queue(position)
@@ -1,88 +1,525 @@
-import anthropic
 import math
-from typing import Annotated, Sequence
+import re
+from functools import lru_cache
+from typing import Dict
 import numexpr
-from langchain_core.messages import BaseMessage
-from langchain_core.runnables import RunnableConfig
-from langchain_core.tools import tool
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
-from langgraph.graph import END, StateGraph
-from langgraph.graph.message import add_messages
-from langgraph.prebuilt.tool_node import ToolNode
-from typing_extensions import TypedDict
-import asyncio
+import numpy as np
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import time
 import streamlit as st
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import closing, contextmanager
 
-openai_api_key = st.secrets['general']["OPENAI_API_KEY"]
-anthropic_api_key = st.secrets['general']["ANTHROPIC_API_KEY"]
+import metrics
+from llm_runtime import LLMRuntime, QueueFullError
 
+MODEL_NAME = "claude-3-7-sonnet-20250219"
 
-@tool
-def calculator(expression: str) -> str:
-    """Calculate expression using Python's numexpr library.
+logger = logging.getLogger(__name__)
+# Latency and token usage of the most recent AI requests in this process
+request_stats = deque(maxlen=200)
 
-    Expression should be a single line mathematical expression
-    that solves the problem.
+
+# Numeric literals in an expression; the lookbehind skips digits inside names like x1
+_NUMBER = re.compile(r'(?<![\w.])(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_NAME = re.compile(r'\b[A-Za-z_]\w*\b(?!\s*\()')
+# Names _template gives the literals it takes out
+_PLACEHOLDER = re.compile(r'_c\d+')
+CONSTANTS = {"pi": math.pi, "e": math.e}
+
+
+def _template(expression):
+    """Split an expression into a template with numbered placeholders and its numeric literals."""
+    reserved = [name for name in _NAME.findall(expression) if _PLACEHOLDER.fullmatch(name)]
+    if reserved:
+        raise ValueError(f"unknown name(s): {', '.join(reserved)}")
+    literals = []
+
+    def placeholder(match):
+        literals.append(float(match.group()))
+        return f"_c{len(literals) - 1}"
+
+    # Whitespace is dropped so "(22 - 1)" and "(20-0)" share a template
+    return _NUMBER.sub(placeholder, re.sub(r'\s+', '', expression)), literals
+
+
+@lru_cache(maxsize=256)
+def _compile(template):
+    """Compile a template once; returns the numexpr program and its argument names in call order."""
+    names = sorted(set(_NAME.findall(template)))
+    unknown = [name for name in names if name not in CONSTANTS and not _PLACEHOLDER.fullmatch(name)]
+    if unknown:
+        raise ValueError(f"unknown name(s): {', '.join(unknown)}")
+    program = numexpr.NumExpr(template, signature=[(name, np.float64) for name in names])
+    return program, names
+
+
+def _format_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 6)
+
+
+def calculator(expressions: Dict[str, str]) -> str:
+    """Calculate a batch of named expressions using Python's numexpr library.
+
+    Pass every calculation you need at once, keyed by a short name, e.g. one
+    entry per month. Each expression should be a single line mathematical
+    expression. Returns a JSON object mapping each name to its result.
 
     Examples:
-        "37593 * 67" for "37593 times 67"
-        "37593**(1/5)" for "37593^(1/5)"
+        {"jan": "(22 - 1) * 0.6", "feb": "(20 - 0) * 0.6"}
+        {"product": "37593 * 67", "root": "37593**(1/5)"}
     """
-    local_dict = {"pi": math.pi, "e": math.e}
-    return str(
-        numexpr.evaluate(
-            expression.strip(),
-            global_dict={},  # restrict access to globals
-            local_dict=local_dict,  # add common mathematical functions
-        )
-    )
-    
-
-# llm = ChatOpenAI(model="gpt-4o", 
-#                  temperature=0.0, 
-#                  openai_api_key = openai_api_key)
-llm = ChatAnthropic(model_name="claude-3-7-sonnet-20250219", 
-                    temperature=0.0, 
-                    anthropic_api_key = anthropic_api_key)
-tools = [calculator]
-llm_with_tools = llm.bind_tools(tools, tool_choice="any")
-
-
-class ChainState(TypedDict):
-    """LangGraph state."""
-
-    messages: Annotated[Sequence[BaseMessage], add_messages]
-
-
-async def acall_chain(state: ChainState, config: RunnableConfig):
-    last_message = state["messages"][-1]
-    response = await llm_with_tools.ainvoke(state["messages"], config)
+    # Expressions that differ only in their numbers share a template and are
+    # evaluated together as one vectorized numexpr call.
+    groups = {}
+    results = {}
+    for name, expression in expressions.items():
+        try:
+            template, literals = _template(expression)
+        except ValueError as exc:
+            results[name] = f"error: {exc}"
+            continue
+        groups.setdefault(template, []).append((name, literals))
+
+    for template, members in groups.items():
+        try:
+            program, arg_names = _compile(template)
+            columns = np.array([literals for _, literals in members], dtype=np.float64).reshape(len(members), -1)
+            args = [np.full(len(members), CONSTANTS[arg]) if arg in CONSTANTS else columns[:, int(arg[2:])]
+                    for arg in arg_names]
+            values = np.broadcast_to(program(*args), (len(members),))
+            for (name, _), value in zip(members, values):
+                results[name] = _format_number(value)
+        except Exception as exc:
+            for name, _ in members:
+                results[name] = f"error: {exc}"
+    return json.dumps({name: results[name] for name in expressions}, separators=(',', ':'))
+
+
+# The LLM client and compiled graph are built on first use and shared by all
+# sessions, so importing this module stays cheap for users who never ask the AI.
+@st.cache_resource(show_spinner=False)
+def get_llm():
+    from langchain_anthropic import ChatAnthropic
+
+    runtime = get_runtime()
+    metrics.register_gauge('ai_requests', lambda: {(('state', state),): value for state, value in runtime.stats().items()
+                                                   if state in ('running', 'waiting')})
+    # Rate-limit retries and timeouts are handled by the runtime, so the SDK doesn't retry on its own
+    return ChatAnthropic(model_name=MODEL_NAME,
+                         temperature=0.0,
+                         max_retries=0,
+                         default_request_timeout=runtime.timeout_seconds,
+                         anthropic_api_key=st.secrets['general']["ANTHROPIC_API_KEY"])
+
+
+@st.cache_resource(show_spinner=False)
+def get_runtime():
+    """The process-wide LLMRuntime every AI request goes through."""
+    return LLMRuntime(max_concurrency=int(os.environ.get('RTO_AI_MAX_CONCURRENCY', 4)),
+                      max_waiting=int(os.environ.get('RTO_AI_MAX_QUEUE', 16)),
+                      timeout_seconds=float(os.environ.get('RTO_AI_TIMEOUT_SECONDS', 120)),
+                      max_retries=int(os.environ.get('RTO_AI_MAX_RETRIES', 3)))
+
+
+def _with_temperature(llm, config):
+    """`llm` with the temperature of the run, when one is set in config["configurable"]."""
+    temperature = (config or {}).get('configurable', {}).get('temperature')
+    return llm if temperature is None else llm.bind(temperature=temperature)
+
+
+async def acall_chain(llm_with_tools, state, config):
+    with metrics.span('graph_node', node='call_tool'):
+        response = await _with_temperature(llm_with_tools, config).ainvoke(state["messages"], config)
     return {"messages": [response]}
 
 
-async def acall_model(state: ChainState, config: RunnableConfig):
-    response = await llm.ainvoke(state["messages"], config)
+async def acall_model(llm, state, config):
+    with metrics.span('graph_node', node='call_model'):
+        response = await _with_temperature(llm, config).ainvoke(state["messages"], config)
     return {"messages": [response]}
 
 
-graph_builder = StateGraph(ChainState)
-graph_builder.add_node("call_tool", acall_chain)
-graph_builder.add_node("execute_tool", ToolNode(tools))
-graph_builder.add_node("call_model", acall_model)
-graph_builder.set_entry_point("call_tool")
-graph_builder.add_edge("call_tool", "execute_tool")
-graph_builder.add_edge("execute_tool", "call_model")
-graph_builder.add_edge("call_model", END)
-chain = graph_builder.compile()
-
-
-async def calculator_tool(user_input):
-    events = chain.astream(
-        {'messages': [('human', user_input)]},
-        stream_mode="values"
-    )
-    results = []
-    async for event in events:
-        results.append(event['messages'][-1])
-    return results
\ No newline at end of file
+# Execution modes of the chain:
+#   "tool"   - call_tool -> execute_tool -> call_model, the model asks numexpr for the arithmetic
+#   "direct" - call_model only, the app precomputes every figure and passes it in the prompt
+TOOL_MODE = "tool"
+DIRECT_MODE = "direct"
+
+
+@st.cache_resource(show_spinner=False)
+def get_chain(mode=TOOL_MODE):
+    from typing import Annotated, Sequence
+    from langchain_core.messages import BaseMessage
+    from langchain_core.runnables import RunnableConfig
+    from langchain_core.tools import tool
+    from langgraph.graph import END, StateGraph
+    from langgraph.graph.message import add_messages
+    from langgraph.prebuilt.tool_node import ToolNode
+    from typing_extensions import TypedDict
+
+    class ChainState(TypedDict):
+        """LangGraph state."""
+
+        messages: Annotated[Sequence[BaseMessage], add_messages]
+
+    llm = get_llm()
+
+    async def call_model(state: ChainState, config: RunnableConfig):
+        return await acall_model(llm, state, config)
+
+    graph_builder = StateGraph(ChainState)
+    graph_builder.add_node("call_model", call_model)
+    if mode == DIRECT_MODE:
+        graph_builder.set_entry_point("call_model")
+    else:
+        tools = [tool(calculator)]
+        llm_with_tools = llm.bind_tools(tools, tool_choice="any")
+
+        async def call_tool(state: ChainState, config: RunnableConfig):
+            return await acall_chain(llm_with_tools, state, config)
+
+        graph_builder.add_node("call_tool", call_tool)
+        tool_node = ToolNode(tools)
+
+        async def execute_tool(state: ChainState, config: RunnableConfig):
+            with metrics.span('graph_node', node='execute_tool'):
+                return await tool_node.ainvoke(state, config)
+
+        graph_builder.add_node("execute_tool", execute_tool)
+        graph_builder.set_entry_point("call_tool")
+        graph_builder.add_edge("call_tool", "execute_tool")
+        graph_builder.add_edge("execute_tool", "call_model")
+    graph_builder.add_edge("call_model", END)
+    return graph_builder.compile()
+
+
+def _normalize(value):
+    """Canonical, JSON-friendly form of a cache key input."""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, 'tolist'):  # numpy scalars/arrays and pandas Series
+        return _normalize(value.tolist())
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 6)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def make_cache_key(model_name=MODEL_NAME, **inputs):
+    """Hash the normalized request inputs, so formatting noise in the prompt doesn't cause misses."""
+    payload = json.dumps(_normalize({'model_name': model_name, **inputs}), sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed cache of AI responses with a TTL and LRU eviction by entry count and size."""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=1000, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back on error) and is closed when the block ends."""
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn, conn:
+            yield conn
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created >= ?", (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.misses += 1
+            metrics.incr('ai_cache_requests_total', result='miss')
+            return None
+        self.hits += 1
+        metrics.incr('ai_cache_requests_total', result='hit')
+        return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode('utf-8')), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        # Drop least recently used entries until both limits hold
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed DESC").fetchall()
+        kept_entries = kept_bytes = 0
+        evicted = []
+        for key, size in rows:
+            if kept_entries < self.max_entries and kept_bytes + size <= self.max_bytes:
+                kept_entries += 1
+                kept_bytes += size
+            else:
+                evicted.append((key,))
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries, 'bytes': size}
+
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    """The process-wide ResponseCache, opened on first use so importing this module doesn't touch the disk."""
+    return ResponseCache(os.environ.get('RTO_AI_CACHE_PATH', os.path.join('.cache', 'ai_responses.sqlite3')))
+
+
+_STREAM_DONE = object()
+
+# Progress label shown once each node finishes
+NODE_STATUS = {
+    'call_tool': "Running the calculator...",
+    'execute_tool': "Writing your plan...",
+    'call_model': "Done",
+}
+
+
+def _message_text(message):
+    """Text of a (streamed) message whose content may be a string or a list of content blocks."""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(block.get('text', '') for block in message.content if isinstance(block, dict))
+
+
+def _stream_chain(chain, user_input, on_status, stats):
+    """Yield call_model tokens from one chain run, recording LLM calls and token usage in `stats`.
+
+    The run goes through the shared LLMRuntime; while it waits for a slot,
+    `on_status` gets the queue position.
+    """
+    events = queue.Queue()
+    emitted = False
+    submitted = time.perf_counter()
+
+    async def produce():
+        nonlocal emitted
+        stats.setdefault('queue_seconds', time.perf_counter() - submitted)
+        stats['attempts'] = stats.get('attempts', 0) + 1
+        try:
+            async for mode, payload in chain.astream(
+                {'messages': [('human', user_input)]},
+                stream_mode=["updates", "messages"]
+            ):
+                emitted = emitted or mode == 'messages'
+                events.put((mode, payload))
+        except Exception as exc:
+            if not emitted:
+                raise  # nothing streamed yet, so the runtime may retry it
+            events.put(('error', exc))
+
+    def finished(future):
+        if not future.cancelled() and future.exception() is not None:
+            events.put(('error', future.exception()))
+        events.put((_STREAM_DONE, None))
+
+    future = get_runtime().submit(produce, on_queue=lambda position: events.put(('queued', position)))
+    future.add_done_callback(finished)
+
+    try:
+        while True:
+            mode, payload = events.get()
+            if mode is _STREAM_DONE:
+                break
+            if mode == 'error':
+                raise payload
+            if mode == 'queued':
+                if on_status is not None:
+                    on_status(f"Waiting for a free AI slot (position {payload} in line)...")
+            elif mode == 'updates':
+                for node, update in payload.items():
+                    for message in (update or {}).get('messages', []):
+                        usage = getattr(message, 'usage_metadata', None)
+                        if usage:
+                            stats['llm_calls'] += 1
+                            stats['input_tokens'] += usage.get('input_tokens', 0)
+                            stats['output_tokens'] += usage.get('output_tokens', 0)
+                    if on_status is not None and node in NODE_STATUS:
+                        on_status(NODE_STATUS[node])
+            else:
+                message, metadata = payload
+                if metadata.get('langgraph_node') == 'call_model':
+                    text = _message_text(message)
+                    if text:
+                        yield text
+    finally:
+        future.cancel()
+
+
+def _record_request_metrics(stats):
+    mode = stats['mode']
+    metrics.incr('ai_requests_total', mode=mode, outcome='ok')
+    metrics.observe('ai_request', stats['seconds'], mode=mode)
+    if 'first_token_seconds' in stats:
+        metrics.observe('ai_first_token', stats['first_token_seconds'], mode=mode)
+    if 'queue_seconds' in stats:
+        metrics.observe('ai_queue_wait', stats['queue_seconds'], mode=mode)
+    metrics.incr('ai_llm_calls_total', stats['llm_calls'], mode=mode)
+    metrics.incr('ai_tokens_total', stats['input_tokens'], mode=mode, direction='input')
+    metrics.incr('ai_tokens_total', stats['output_tokens'], mode=mode, direction='output')
+    metrics.log_event('ai_request', **stats)
+
+
+def stream_calculator_tool(user_input, cache_key, on_status=None, mode=TOOL_MODE, fallback_input=None):
+    """Yield the final answer token by token as the chain produces it.
+
+    The chain runs on the shared LLMRuntime loop and hands events over through a
+    queue, so this is a plain generator that can be passed to st.write_stream.
+    `on_status` is called with the queue position while waiting and with a
+    progress label as each graph node completes. Closing the generator early
+    (e.g. the script reruns) cancels the request. QueueFullError is raised when
+    the runtime is saturated.
+
+    In DIRECT_MODE a failure before the first token falls back to the tool chain
+    with `fallback_input`, when given. Latency and token usage of every run are
+    logged and kept in `request_stats`.
+    """
+    cached = get_response_cache().get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    runs = [(mode, user_input)]
+    if mode == DIRECT_MODE and fallback_input is not None:
+        runs.append((TOOL_MODE, fallback_input))
+
+    for attempt, (run_mode, run_input) in enumerate(runs):
+        chain = get_chain(run_mode)  # build on the script thread, the loop thread only runs it
+        stats = {'mode': run_mode, 'llm_calls': 0, 'input_tokens': 0, 'output_tokens': 0}
+        start = time.perf_counter()
+        chunks = []
+        try:
+            for text in _stream_chain(chain, run_input, on_status, stats):
+                if not chunks:
+                    stats['first_token_seconds'] = time.perf_counter() - start
+                chunks.append(text)
+                yield text
+        except QueueFullError:
+            metrics.incr('ai_requests_total', mode=run_mode, outcome='rejected')
+            raise
+        except Exception:
+            metrics.incr('ai_requests_total', mode=run_mode, outcome='error')
+            if chunks or attempt == len(runs) - 1:
+                raise
+            logger.warning("%s chain failed before the first token, falling back to %s", run_mode, runs[-1][0],
+                           exc_info=True)
+            continue
+        stats['seconds'] = time.perf_counter() - start
+        request_stats.append(stats)
+        logger.info("AI request %s", json.dumps(stats))
+        _record_request_metrics(stats)
+        get_response_cache().set(cache_key, "".join(chunks))
+        return
+
+
+# Sampling temperatures of the candidates generate_candidates runs, in order
+CANDIDATE_TEMPERATURES = (0.0, 0.5, 1.0)
+
+
+def _candidate_factory(chain, user_input, temperature, stats):
+    async def produce():
+        stats['attempts'] = stats.get('attempts', 0) + 1
+        state = await chain.ainvoke({'messages': [('human', user_input)]},
+                                    {'configurable': {'temperature': temperature}})
+        for message in state['messages']:
+            usage = getattr(message, 'usage_metadata', None)
+            if usage:
+                stats['llm_calls'] += 1
+                stats['input_tokens'] += usage.get('input_tokens', 0)
+                stats['output_tokens'] += usage.get('output_tokens', 0)
+        return _message_text(state['messages'][-1])
+    return produce
+
+
+def generate_candidates(runs, budget_seconds, on_status=None):
+    """Run several chain generations at once and return the ones that finish within `budget_seconds`.
+
+    `runs` is a list of (mode, user_input, temperature). The first run is always
+    submitted to the shared LLMRuntime (QueueFullError if it can't be); the others
+    only while the runtime has free slots, so one user's extra candidates never
+    queue in front of other users' requests. Runs still going when the budget is
+    spent are cancelled.
+
+    Returns a list of dicts with 'mode', 'temperature', 'seconds' and either 'text'
+    or 'error', in the order they finished. `on_status` gets a progress label.
+    """
+    runtime = get_runtime()
+    submitted = {}
+    for index, (mode, user_input, temperature) in enumerate(runs):
+        load = runtime.stats()
+        if index and (load['waiting'] or load['running'] >= load['max_concurrency']):
+            break
+        chain = get_chain(mode)
+        stats = {'mode': mode, 'temperature': temperature, 'llm_calls': 0, 'input_tokens': 0, 'output_tokens': 0}
+        try:
+            future = runtime.submit(_candidate_factory(chain, user_input, temperature, stats))
+        except QueueFullError:
+            metrics.incr('ai_requests_total', mode=mode, outcome='rejected')
+            if not submitted:
+                raise
+            break
+        submitted[future] = (stats, time.perf_counter())
+
+    deadline = time.perf_counter() + budget_seconds
+    pending = set(submitted)
+    candidates = []
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                stats, start = submitted[future]
+                stats['seconds'] = time.perf_counter() - start
+                candidate = {'mode': stats['mode'], 'temperature': stats['temperature'], 'seconds': stats['seconds']}
+                if future.exception() is not None:
+                    metrics.incr('ai_requests_total', mode=stats['mode'], outcome='error')
+                    logger.warning("AI candidate (%s, temperature %s) failed", stats['mode'], stats['temperature'],
+                                   exc_info=future.exception())
+                    candidate['error'] = future.exception()
+                else:
+                    request_stats.append(stats)
+                    _record_request_metrics(stats)
+                    candidate['text'] = future.result()
+                candidates.append(candidate)
+            if on_status is not None:
+                on_status(f"{len(candidates)} of {len(submitted)} drafts back...")
+    finally:
+        for future in pending:
+            future.cancel()
+            metrics.incr('ai_requests_total', mode=submitted[future][0]['mode'], outcome='cancelled')
+    return candidates
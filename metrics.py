@@ -0,0 +1,190 @@
+"""Lightweight in-process timing spans and counters.
+
+Spans and counters are aggregated in memory under one lock (a few
+microseconds per span) and can be read back three ways:
+
+- `snapshot()` for the app's debug panel,
+- one JSON log line per span/AI request on the "metrics" logger, printed to
+  stderr with RTO_METRICS_LOG=1 (along with the prompt sizes and AI request
+  summaries that ai_prompt and math_tool log at INFO),
+- Prometheus text: `prometheus_text()`, written to RTO_METRICS_FILE by
+  `export()`, or served on RTO_METRICS_PORT by `serve()`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('metrics')
+# Loggers whose INFO lines RTO_METRICS_LOG turns on: spans, prompt sizes and AI request summaries
+LOGGED_MODULES = ('metrics', 'ai_prompt', 'math_tool')
+if os.environ.get('RTO_METRICS_LOG'):
+    # Nothing configures logging in the app, and Python's fallback handler drops INFO, so attach our own
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    for _name in LOGGED_MODULES:
+        logging.getLogger(_name).setLevel(logging.INFO)
+        logging.getLogger(_name).addHandler(_handler)
+
+PREFIX = 'rto'
+# Upper bounds (seconds) of the span histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_spans = {}  # (name, labels) -> {'count', 'sum', 'max', 'last', 'buckets'}
+_counters = {}  # (name, labels) -> value
+_gauges = {}  # name -> callable returning {labels: value}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Record one duration for the span `name`."""
+    key = _key(name, labels)
+    with _lock:
+        span = _spans.get(key)
+        if span is None:
+            span = _spans[key] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'last': 0.0, 'buckets': [0] * len(BUCKETS)}
+        span['count'] += 1
+        span['sum'] += seconds
+        span['max'] = max(span['max'], seconds)
+        span['last'] = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                span['buckets'][i] += 1
+                break
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'span': name, 'seconds': round(seconds, 6), **labels}))
+
+
+@contextmanager
+def span(name, **labels):
+    """Time the enclosed block as the span `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def incr(name, value=1, **labels):
+    """Add `value` to the counter `name`."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def register_gauge(name, read):
+    """Report `read()` as gauge `name` at export time; it returns a number or a {labels tuple: value} dict."""
+    _gauges[name] = read
+
+
+def log_event(event, **fields):
+    """Structured JSON log line for a one-off event such as a finished AI request."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'event': event, **fields}, default=str))
+
+
+def _gauge_values():
+    values = {}
+    for name, read in list(_gauges.items()):
+        try:
+            value = read()
+        except Exception:
+            logger.debug("gauge %s failed", name, exc_info=True)
+            continue
+        values[name] = value if isinstance(value, dict) else {(): value}
+    return values
+
+
+def snapshot():
+    """Plain-dict copy of every span, counter and gauge."""
+    with _lock:
+        spans = [{'span': name, **dict(labels), 'count': s['count'], 'mean_ms': 1000 * s['sum'] / s['count'],
+                  'max_ms': 1000 * s['max'], 'last_ms': 1000 * s['last']}
+                 for (name, labels), s in _spans.items()]
+        counters = [{'counter': name, **dict(labels), 'value': value} for (name, labels), value in _counters.items()]
+    gauges = [{'gauge': name, **dict(labels), 'value': value}
+              for name, values in _gauge_values().items() for labels, value in values.items()]
+    return {'spans': spans, 'counters': counters, 'gauges': gauges}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def prometheus_text():
+    """All metrics in the Prometheus text exposition format."""
+    lines = [f'# TYPE {PREFIX}_span_seconds histogram']
+    with _lock:
+        for (name, labels), s in sorted(_spans.items()):
+            labels = (('span', name),) + labels
+            cumulative = 0
+            for bound, count in zip(BUCKETS, s['buckets']):
+                cumulative += count
+                lines.append(f'{PREFIX}_span_seconds_bucket{_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{PREFIX}_span_seconds_bucket{_labels(labels, [("le", "+Inf")])} {s["count"]}')
+            lines.append(f'{PREFIX}_span_seconds_sum{_labels(labels)} {s["sum"]:.6f}')
+            lines.append(f'{PREFIX}_span_seconds_count{_labels(labels)} {s["count"]}')
+        counters = sorted(_counters.items())
+    typed = set()
+    for (name, labels), value in counters:
+        if name not in typed:
+            lines.append(f'# TYPE {PREFIX}_{name} counter')
+            typed.add(name)
+        lines.append(f'{PREFIX}_{name}{_labels(labels)} {value}')
+    for name, values in sorted(_gauge_values().items()):
+        lines.append(f'# TYPE {PREFIX}_{name} gauge')
+        for labels, value in values.items():
+            lines.append(f'{PREFIX}_{name}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def export(path=None):
+    """Write prometheus_text() to `path` (default RTO_METRICS_FILE); no-op when neither is set."""
+    path = path or os.environ.get('RTO_METRICS_FILE')
+    if not path:
+        return
+    # Sessions rerun concurrently, each needs its own temporary file
+    tmp_path = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+def serve(port=None):
+    """Serve /metrics on `port` (default RTO_METRICS_PORT) from a daemon thread; returns the server or None."""
+    port = port or os.environ.get('RTO_METRICS_PORT')
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('', int(port)), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
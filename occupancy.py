@@ -0,0 +1,266 @@
+"""Org-wide daily office occupancy forecast with desk-capacity checks.
+
+Takes the same employee file as rto_batch.py, plus two optional columns
+
+    site                (default 'default')
+    preferred_weekdays  (e.g. 'Tue,Wed,Thu'; default: no preference)
+
+and places each employee's required office days for every month (the same
+numbers as the app's monthly table) on concrete workdays: preferred weekdays
+first, spread evenly over the month, then the other workdays. Each employee
+starts that order at a different day (a hash of employee_id), so people with the
+same inputs spread over the month instead of all coming in on the same days.
+Summing the resulting people x days matrix per site gives the expected headcount
+per day, which is compared against the desk capacity of the site.
+
+The matrix is built in chunks of employees, so memory is bounded by the chunk
+size (5000 employees x 3 years is about 5 MB of booleans, plus twice that for
+the per-employee ranks they come from) and only the per-site daily totals are kept.
+
+Usage:
+    python occupancy.py employees.csv --capacity 400 --site-capacity NYC=250 \\
+        --daily daily.csv --weekly weekly.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from rto_batch import iter_chunks, monthly_pto_matrix, normalize_employees
+from calendars import DEFAULT_CALENDAR
+from rto_core import calculate_office_days, get_day_calendar
+
+DEFAULT_SITE = 'default'
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+# Rank given to days nobody is placed on (weekends, holidays, outside the range)
+NO_RANK = np.iinfo(np.uint8).max
+
+
+def parse_weekdays(value):
+    """'Tue, Wed,thursday' -> (1, 2, 3); empty or missing means no preference."""
+    if not isinstance(value, str):
+        return ()
+    names = [name.strip().lower()[:3] for name in value.replace(';', ',').split(',') if name.strip()]
+    unknown = [name for name in names if name not in WEEKDAYS]
+    if unknown:
+        raise ValueError(f"unknown weekday(s): {', '.join(unknown)}")
+    return tuple(sorted({WEEKDAYS.index(name) for name in names}))
+
+
+def _bit_reverse(values, bits):
+    reversed_values = np.zeros_like(values)
+    for b in range(int(bits.max(initial=0))):
+        # values < 2 ** bits, so bits past a value's own width are 0 and the clipped shift is harmless
+        reversed_values |= ((values >> b) & 1) << np.maximum(bits - 1 - b, 0)
+    return reversed_values
+
+
+def employee_shifts(employees):
+    """Per-employee starting point in the selection order: a stable hash of employee_id (or the row label)."""
+    ids = employees['employee_id'] if 'employee_id' in employees else employees.index.to_series()
+    hashes = pd.util.hash_array(ids.astype(str).to_numpy(dtype=object), categorize=False)
+    return (hashes % np.uint64(2 ** 14)).astype(np.int16)
+
+
+class OccupancyCalendar:
+    """Global day axis of the forecast, with one selection order per preferred-weekday set.
+
+    Workdays of a month get a rank (0 = placed first). Taking every day with
+    rank < n gives n days that favour the preferred weekdays and, within each
+    class of days, are spread over the month by bit-reversed (van der Corput)
+    order, so any n is evenly spread rather than front-loaded. A shift rotates
+    the order within each class, so over many shifts every day of a class is
+    picked equally often.
+    """
+
+    def __init__(self, start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+        self.calendar = get_day_calendar(start_date, end_date, extended_christmas_break, calendar)
+        self.days = self.calendar.days
+        start = self.calendar.start
+        self.month_ids = np.asarray((self.days.year - start.year) * 12 + self.days.month - start.month)
+        self.months = pd.period_range(start, self.calendar.end, freq='M')
+        self.month_keys = list(self.months.strftime('%Y-%m'))
+        self.month_ends = self.months.end_time.normalize()
+        self.workdays = np.bincount(self.month_ids, weights=self.calendar.is_workday, minlength=len(self.months))
+        self._ranks = {}
+
+    def ranks(self, preferred_weekdays, shifts=None):
+        """Rank per day, or a shifts x days matrix of ranks with the order rotated by each shift."""
+        if preferred_weekdays not in self._ranks:
+            self._ranks[preferred_weekdays] = self._build_order(preferred_weekdays)
+        ordinal, size, offset = self._ranks[preferred_weekdays]
+        if shifts is None:
+            return offset + ordinal
+        return offset + (ordinal + np.asarray(shifts, dtype=np.int16)[:, None]) % size
+
+    def _build_order(self, preferred_weekdays):
+        """(ordinal within the day's class, size of the class, rank of the class's first day) per day."""
+        workday_index = np.flatnonzero(self.calendar.is_workday)
+        preferred = np.ones(len(workday_index), dtype=bool)
+        if preferred_weekdays:
+            preferred = np.isin(self.days.weekday[workday_index], preferred_weekdays)
+        month_ids = self.month_ids[workday_index]
+        group = month_ids * 2 + (~preferred)
+
+        # Position of each day within its (month, class) group, in date order
+        order = np.argsort(group, kind='stable')
+        sorted_group = group[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_group)) + 1]
+        counts = np.diff(np.r_[starts, len(sorted_group)])
+        position = np.arange(len(sorted_group)) - np.repeat(starts, counts)
+        bits = np.ceil(np.log2(np.maximum(np.repeat(counts, counts), 1))).astype(np.int64)
+
+        # Re-order each group by bit-reversed position and number the days 0, 1, 2, ...
+        spread = np.lexsort((_bit_reverse(position, bits), sorted_group))
+        ordinal = np.empty(len(spread), dtype=np.int64)
+        ordinal[spread] = np.arange(len(spread)) - np.repeat(starts, counts)
+
+        # Other weekdays come after all preferred days of the month
+        n_preferred = np.bincount(month_ids[preferred], minlength=len(self.months))
+        sorted_months = month_ids[order]
+
+        # Days nobody is placed on get NO_RANK whatever the shift
+        day_ordinal = np.zeros(len(self.days), dtype=np.int16)
+        day_size = np.ones(len(self.days), dtype=np.int16)
+        day_offset = np.full(len(self.days), NO_RANK, dtype=np.int16)
+        day_ordinal[workday_index[order]] = ordinal
+        day_size[workday_index[order]] = np.repeat(counts, counts)
+        day_offset[workday_index[order]] = np.where(sorted_group % 2 == 1, n_preferred[sorted_months], 0)
+        return day_ordinal, day_size, day_offset
+
+    def office_days(self, employees):
+        """Employees x months office days (uint8) from each employee's RTO %, PTO and policy.
+
+        Months outside an employee's range (same rule as calculate_monthly_workdays) are 0.
+        Half PTO days still mean a trip to the office, so partial days round up.
+        """
+        pto = monthly_pto_matrix(employees, self.month_keys)
+        rto_percentage = employees['rto_percentage'].to_numpy()[:, None]
+        office = np.zeros(pto.shape)
+        for policy in employees['pto_accounting_policy'].unique():
+            rows = (employees['pto_accounting_policy'] == policy).to_numpy()
+            _, office[rows] = calculate_office_days(self.workdays[None, :], pto[rows], rto_percentage[rows], policy)
+        office = np.clip(np.ceil(office), 0, np.maximum(self.workdays[None, :] - np.ceil(pto), 0))
+
+        month_ends = self.month_ends.to_numpy()[None, :]
+        in_range = ((month_ends >= employees['start_date'].to_numpy()[:, None])
+                    & (month_ends <= employees['end_date'].to_numpy()[:, None]))
+        return np.where(in_range, office, 0).astype(np.uint8)
+
+    def occupancy(self, employees, preferred_weekdays):
+        """Boolean people x days matrix: True where the employee is expected in the office."""
+        office = self.office_days(employees)
+        return self.ranks(preferred_weekdays, employee_shifts(employees)) < office[:, self.month_ids]
+
+
+def forecast_headcount(employees, chunksize=5000):
+    """Expected headcount per day per site, as a DataFrame indexed by date with one column per site.
+
+    `employees` is a DataFrame or an iterable of DataFrame chunks in the rto_batch input format.
+    """
+    chunks = [employees] if isinstance(employees, pd.DataFrame) else employees
+    chunks = [normalize_employees(chunk) for chunk in chunks]
+    if not chunks or not sum(len(chunk) for chunk in chunks):
+        return pd.DataFrame()
+    start = min(chunk['start_date'].min() for chunk in chunks).to_period('M').start_time
+    end = max(chunk['end_date'].max() for chunk in chunks)
+    occupancy_calendars = {}
+    totals = {}
+
+    for chunk in chunks:
+        chunk = chunk.copy()
+        chunk['site'] = chunk['site'].fillna(DEFAULT_SITE).astype(str) if 'site' in chunk else DEFAULT_SITE
+        chunk['preferred_weekdays'] = (chunk['preferred_weekdays'].map(parse_weekdays)
+                                       if 'preferred_weekdays' in chunk else [()] * len(chunk))
+        group_keys = ['extended_christmas_break', 'holiday_calendar', 'preferred_weekdays']
+        for (christmas_break, holiday_calendar, preferred), group in chunk.groupby(group_keys, sort=False):
+            calendar_key = (christmas_break, holiday_calendar)
+            if calendar_key not in occupancy_calendars:
+                occupancy_calendars[calendar_key] = OccupancyCalendar(start, end, christmas_break, holiday_calendar)
+            calendar = occupancy_calendars[calendar_key]
+            for offset in range(0, len(group), chunksize):
+                part = group.iloc[offset:offset + chunksize].sort_values('site', kind='stable')
+                occupancy = calendar.occupancy(part, preferred).view(np.uint8)
+                sites = part['site'].to_numpy()
+                site_starts = np.r_[0, np.flatnonzero(sites[1:] != sites[:-1]) + 1]
+                per_site = np.add.reduceat(occupancy, site_starts, axis=0, dtype=np.int32)
+                for site, counts in zip(sites[site_starts], per_site):
+                    if site in totals:
+                        totals[site] += counts
+                    else:
+                        totals[site] = counts
+
+    days = next(iter(occupancy_calendars.values())).days
+    return pd.DataFrame(totals, index=pd.Index(days, name='Date')).sort_index(axis=1)
+
+
+def capacity_report(headcount, capacity, site_capacity=None):
+    """Daily and weekly (ISO week) occupancy against desk capacity.
+
+    `capacity` applies to every site unless `site_capacity` maps the site to its own number.
+    Returns (daily, weekly) DataFrames.
+    """
+    site_capacity = site_capacity or {}
+    daily = headcount.stack().reset_index()
+    daily.columns = ['Date', 'Site', 'Headcount']
+    daily['Capacity'] = daily['Site'].map(lambda site: site_capacity.get(site, capacity))
+    daily['Utilization'] = daily['Headcount'] / daily['Capacity'].where(daily['Capacity'] > 0)
+    daily['Over Capacity'] = daily['Headcount'] > daily['Capacity']
+
+    iso = daily['Date'].dt.isocalendar()
+    daily['Week'] = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+    by_week = daily.groupby(['Site', 'Week'], sort=True)
+    peak_rows = daily.loc[by_week['Headcount'].idxmax()]
+    weekly = pd.DataFrame({
+        'Site': peak_rows['Site'].to_numpy(),
+        'Week': peak_rows['Week'].to_numpy(),
+        'Peak Headcount': peak_rows['Headcount'].to_numpy(),
+        'Peak Date': peak_rows['Date'].to_numpy(),
+        'Capacity': peak_rows['Capacity'].to_numpy(),
+        'Days Over Capacity': by_week['Over Capacity'].sum().to_numpy(),
+    })
+    weekly['Peak Utilization'] = weekly['Peak Headcount'] / weekly['Capacity'].where(weekly['Capacity'] > 0)
+    return daily.drop(columns='Week'), weekly
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast daily office occupancy per site against desk capacity.")
+    parser.add_argument('input', help="CSV or .parquet file with one row per employee (see rto_batch.py)")
+    parser.add_argument('--capacity', type=int, required=True, help="Desks per site")
+    parser.add_argument('--site-capacity', action='append', default=[], metavar='SITE=DESKS',
+                        help="Desks for one site, overrides --capacity (repeatable)")
+    parser.add_argument('--chunksize', type=int, default=5000, help="Employees per occupancy chunk")
+    parser.add_argument('--daily', help="Write the daily table to this CSV file")
+    parser.add_argument('--weekly', help="Write the weekly peak table to this CSV file")
+    args = parser.parse_args(argv)
+
+    site_capacity = {}
+    for item in args.site_capacity:
+        site, _, desks = item.rpartition('=')
+        if not site:
+            parser.error(f"--site-capacity expects SITE=DESKS, got {item!r}")
+        site_capacity[site] = int(desks)
+
+    headcount = forecast_headcount(iter_chunks(args.input, args.chunksize), chunksize=args.chunksize)
+    if headcount.empty:
+        print("No employees in the input")
+        return
+    daily, weekly = capacity_report(headcount, args.capacity, site_capacity)
+    if args.daily:
+        daily.to_csv(args.daily, index=False)
+    if args.weekly:
+        weekly.to_csv(args.weekly, index=False)
+
+    for site, site_days in daily.groupby('Site'):
+        peak = site_days.loc[site_days['Headcount'].idxmax()]
+        over = site_days[site_days['Over Capacity']]
+        print(f"{site}: peak {peak['Headcount']} on {peak['Date']:%a %b %d, %Y} "
+              f"(capacity {peak['Capacity']}), {len(over)} day(s) over capacity")
+        for _, row in over.head(10).iterrows():
+            print(f"  {row['Date']:%Y-%m-%d}  {row['Headcount']} / {row['Capacity']}")
+        if len(over) > 10:
+            print(f"  ... {len(over) - 10} more")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Parse AI PTO plans and check them against the local calendar and office-day math.
+
+The AI answers in the plain-text layout asked for by ai_prompt.build_ai_prompt.
+parse_plan turns that text into per-month PTO counts, office days and dates, and
+check_plan recomputes what the model claims. A plan is invalid when
+
+- a date is outside the period, not a workday of the holiday calendar, or
+  between Dec 24 and Dec 31 (the same rule pto_optimizer follows),
+- a month's PTO count doesn't match its dates plus the PTO already planned there,
+- a month's office days don't match calculate_office_days,
+- the total PTO is over the allowance.
+
+Valid plans are ranked the way pto_optimizer ranks its own: fewest office days
+first, then the longest break.
+"""
+import re
+from calendar import month_abbr
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from calendars import DEFAULT_CALENDAR
+from pto_optimizer import _breaks
+from rto_core import calculate_office_days, get_day_calendar
+
+_MONTHS = {name.lower(): number for number, name in enumerate(month_abbr) if name}
+_MONTH_NAMES = 'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec'
+_MONTH_NAME = rf'({_MONTH_NAMES})[a-z]*\.?'
+_MONTH_LINE = re.compile(rf'month:\W*{_MONTH_NAME}\s*(\d{{4}})?', re.I)
+_PTO_LINE = re.compile(r'pto days:\W*(\d+(?:\.\d+)?)', re.I)
+_OFFICE_LINE = re.compile(r'office days:\W*(-?\d+(?:\.\d+)?)', re.I)
+_DATES_LINE = re.compile(r'dates to take:(.*)', re.I)
+_WEEKDAY = re.compile(r'\b(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?,?\s*', re.I)
+# Pieces of a dates line: "Jul 7, 8 and 9", "Jan 6th & 7th; Jan 9"
+_SEPARATOR = re.compile(r'\s*(?:[,;&+]|\band\b)\s*', re.I)
+# Between the two ends of a range: "2025-07-07..2025-07-09", "Jul 7 to 11", "Dec 30 - Jan 2"
+_RANGE = re.compile(r'\s*(?:\.\.|–|—|\bto\b|\bthrough\b|\s-\s)\s*', re.I)
+_DATE = re.compile(rf'(?:(?P<iso>\d{{4}}-\d{{1,2}}-\d{{1,2}})'
+                   rf'|(?P<numeric_month>\d{{1,2}})/(?P<numeric_day>\d{{1,2}})(?:/(?P<numeric_year>\d{{2}}|\d{{4}}))?'
+                   rf'|(?:(?P<month>{_MONTH_NAMES})[a-z]*\.?\s+)?(?P<day>\d{{1,2}})(?:st|nd|rd|th)?'
+                   rf'(?:\s+(?P<year>\d{{4}}))?)', re.I)
+_EMPTY = {'', 'none', 'n/a', '-'}
+
+
+def _near_year(month, block_year, block_month):
+    """Year of `month` when it is mentioned under block_year-block_month (a 'Jan 02' under Dec is next year)."""
+    if month - block_month > 6:
+        return block_year - 1
+    if block_month - month > 6:
+        return block_year + 1
+    return block_year
+
+
+def _parse_date(text, context):
+    """One date, or None. `context` is the (year, month) a bare day number like "8" belongs to."""
+    match = _DATE.fullmatch(text.strip())
+    if match is None:
+        return None
+    try:
+        if match['iso']:
+            return date(*map(int, match['iso'].split('-')))
+        if match['numeric_month']:
+            month, day = int(match['numeric_month']), int(match['numeric_day'])
+            year = match['numeric_year']
+            year = (int(year) + 2000 if len(year) == 2 else int(year)) if year else _near_year(month, *context)
+            return date(year, month, day)
+        month = _MONTHS[match['month'][:3].lower()] if match['month'] else context[1]
+        year = int(match['year']) if match['year'] else _near_year(month, *context)
+        return date(year, month, int(match['day']))
+    except ValueError:  # "Feb 30"
+        return None
+
+
+def _parse_dates(text, block_year, block_month):
+    """(dates, spans, unread) of one 'Dates to take' line.
+
+    Spans are inclusive (start, end) ranges. Dates may be ISO, "Jul 7", "July 7th, 2025"
+    or "7/7", optionally with a weekday; a bare day ("Jul 7, 8 and 9") takes the month of
+    the date before it. Pieces that aren't dates are returned in `unread`.
+    """
+    dates, spans, unread = [], [], []
+    text = re.sub(r'\(.*?\)', '', text)  # asides like "(extends the July 4th weekend)" aren't dates to take
+    text = _WEEKDAY.sub('', text)
+    text = re.sub(r'(\d)(st|nd|rd|th)?,\s*(\d{4})\b(?![-/])', r'\1\2 \3', text)  # "July 7, 2025" is one date
+    context = (block_year, block_month)
+    for piece in _SEPARATOR.split(text.strip().rstrip('.')):
+        if piece.strip().lower() in _EMPTY:
+            continue
+        day = _parse_date(piece, context)
+        if day is not None:
+            dates.append(day)
+            context = (day.year, day.month)
+            continue
+        # A range: try the spaced separators first, then a bare hyphen as in "Jul 7-11"
+        ends = _RANGE.split(piece, maxsplit=1)
+        if len(ends) != 2 and piece.count('-') == 1:
+            ends = piece.split('-')
+        start = _parse_date(ends[0], context) if len(ends) == 2 else None
+        end = _parse_date(ends[1], (start.year, start.month)) if start is not None else None
+        if end is None or end < start:
+            unread.append(piece.strip())
+            continue
+        spans.append((start, end))
+        context = (end.year, end.month)
+    return dates, spans, unread
+
+
+def parse_plan(text, months):
+    """Per-month blocks of an AI plan, keyed by the 'YYYY-MM' of `months` they refer to.
+
+    Each block has the stated 'pto_days' and 'office_days' (None when missing) and the
+    'dates', 'spans' and 'unread' text from its 'Dates to take' line. Month headings that don't fall
+    in `months` are returned under 'unknown_months'.
+    """
+    blocks, unknown, key = {}, [], None
+    for line in text.splitlines():
+        match = _MONTH_LINE.search(line)
+        if match:
+            month_number = _MONTHS[match.group(1)[:3].lower()]
+            key = next((month for month in months if int(month[5:7]) == month_number
+                        and (match.group(2) is None or month[:4] == match.group(2))
+                        and month not in blocks), None)
+            if key is None:
+                unknown.append(line.strip(' -*'))
+                continue
+            blocks[key] = {'pto_days': None, 'office_days': None, 'dates': [], 'spans': [], 'unread': []}
+            continue
+        if key is None:
+            continue
+        block = blocks[key]
+        if block['pto_days'] is None and (match := _PTO_LINE.search(line)):
+            block['pto_days'] = float(match.group(1))
+        elif block['office_days'] is None and (match := _OFFICE_LINE.search(line)):
+            block['office_days'] = float(match.group(1))
+        elif match := _DATES_LINE.search(line):
+            dates, spans, unread = _parse_dates(match.group(1), int(key[:4]), int(key[5:7]))
+            block['dates'] += dates
+            block['spans'] += spans
+            block['unread'] += unread
+    return {'months': blocks, 'unknown_months': unknown}
+
+
+def check_plan(parsed, monthly_workdays, rto_percentage, pto_accounting_policy, extended_christmas_break,
+               pto_allowance, planned_pto=None, calendar=DEFAULT_CALENDAR):
+    """Recompute a parsed plan and list what doesn't hold.
+
+    `planned_pto` maps 'YYYY-MM' to PTO already planned (not tied to dates), which the
+    plan's per-month PTO counts include. Spans ('Jul 7-11') count their workdays only;
+    a single date on a weekend or holiday is an error.
+
+    Returns a dict with 'valid', 'issues' (why it is invalid), 'warnings' (allowed but
+    against the prompt's advice), the checked 'pto_dates' and 'monthly_pto', and
+    'total_office_days', 'total_pto' and 'longest_break' for ranking.
+    """
+    planned_pto = planned_pto or {}
+    months = list(monthly_workdays)
+    issues = [f"month not in the period: {label}" for label in parsed['unknown_months']]
+    if not parsed['months']:
+        issues.append("no monthly plan found")
+
+    first = pd.Timestamp(months[0] + '-01')
+    last = pd.Timestamp(months[-1] + '-01') + pd.offsets.MonthEnd(0)
+    day_calendar = get_day_calendar(first, last, extended_christmas_break, calendar)
+    days = day_calendar.days
+    is_workday = day_calendar.is_workday
+
+    pto = np.zeros(len(days), dtype=bool)
+    for block in parsed['months'].values():
+        for day in block['dates']:
+            index = (pd.Timestamp(day) - first).days
+            if not 0 <= index < len(days):
+                issues.append(f"{day:%a %b %d %Y} is outside the period")
+            elif not is_workday[index]:
+                issues.append(f"{day:%a %b %d %Y} is not a workday")
+            else:
+                pto[index] = True
+        for start, end in block['spans']:
+            start_index = max((pd.Timestamp(start) - first).days, 0)
+            end_index = min((pd.Timestamp(end) - first).days, len(days) - 1)
+            if start_index > end_index:
+                issues.append(f"{start:%b %d} - {end:%b %d} is outside the period")
+            pto[start_index:end_index + 1] |= is_workday[start_index:end_index + 1]
+    blocked = pto & (days.month == 12) & (days.day >= 24)
+    issues += [f"{day:%a %b %d %Y} is in the Christmas week" for day in days[blocked]]
+
+    month_keys = days.strftime('%Y-%m')
+    new_pto = pd.Series(pto, index=month_keys).groupby(level=0).sum()
+    monthly_pto = {month: planned_pto.get(month, 0.0) + float(new_pto.get(month, 0)) for month in months}
+    workdays = np.array(list(monthly_workdays.values()), dtype=float)
+    _, office_days = calculate_office_days(workdays, np.array(list(monthly_pto.values())), rto_percentage,
+                                           pto_accounting_policy)
+    office_by_month = dict(zip(months, office_days))
+
+    for month, block in parsed['months'].items():
+        label = f"{month_abbr[int(month[5:7])]} {month[:4]}"
+        issues += [f"{label}: couldn't read {text!r} as dates" for text in block['unread']]
+        if block['pto_days'] is None:
+            issues.append(f"{label}: no PTO Days line")
+        elif abs(block['pto_days'] - monthly_pto[month]) >= 0.5:
+            issues.append(f"{label}: {block['pto_days']:g} PTO days stated, the dates give {monthly_pto[month]:g}")
+        if block['office_days'] is None:
+            issues.append(f"{label}: no office days line")
+        elif block['office_days'] != office_by_month[month]:
+            issues.append(f"{label}: {block['office_days']:g} office days stated, the formula gives "
+                          f"{office_by_month[month]:g}")
+
+    total_pto = sum(monthly_pto.values())
+    if total_pto > pto_allowance + 1e-9:
+        issues.append(f"{total_pto:g} PTO days in total, over the allowance of {pto_allowance:g}")
+
+    # Allowed, but the prompt asks to avoid it
+    warnings = []
+    weeks = pd.Series(pto & (days.weekday < 5), index=days).resample('W-SUN').sum()
+    warnings += [f"full week of PTO starting {week - pd.Timedelta(days=6):%b %d}" for week in weeks.index[weeks >= 5]]
+
+    breaks = _breaks(days, ~is_workday, pto)
+    return {
+        'valid': not issues,
+        'issues': issues,
+        'warnings': warnings,
+        'pto_dates': list(days[pto]),
+        'monthly_pto': monthly_pto,
+        'total_pto': total_pto,
+        'total_office_days': float(office_days.sum()),
+        'longest_break': max((b['Days Off'] for b in breaks), default=0),
+    }
+
+
+def rank_candidates(candidates):
+    """Split candidates (dicts with a 'check' result and 'temperature') into (valid ranked best first, invalid)."""
+    valid = [candidate for candidate in candidates if candidate['check']['valid']]
+    invalid = [candidate for candidate in candidates if not candidate['check']['valid']]
+    valid.sort(key=lambda candidate: (candidate['check']['total_office_days'], -candidate['check']['longest_break'],
+                                      len(candidate['check']['warnings']), candidate['temperature']))
+    return valid, invalid
@@ -0,0 +1,200 @@
+"""Deterministic PTO planner.
+
+Places a budget of whole PTO days on concrete dates so that, in order of priority,
+1. the total required office days (per the PTO accounting policy) is minimal, and
+2. the PTO days build the longest breaks around weekends and company holidays.
+
+It follows the same rules the AI prompt asks for: no PTO between Dec 24 and
+Dec 31, and never a full Monday-Friday week made of PTO days.
+
+The search is a dynamic program over the day-level calendar. Within a month the
+state is (how the previous day was spent, PTO used in the month), searched for all
+months and every way of entering them at once; the months are then chained on
+(how the month ended, PTO used so far). The plan it returns is optimal for the
+objective above, not a heuristic. Time and memory grow with months x PTO in the
+most PTO a month can hold; 10 years with 60 PTO days takes well under a second.
+"""
+import numpy as np
+import pandas as pd
+
+from calendars import DEFAULT_CALENDAR
+from rto_core import build_monthly_data, calculate_monthly_workdays, calculate_office_days, get_custom_holidays
+
+MAX_CONSECUTIVE_PTO = 4
+
+# How the previous day was spent
+OFFICE = 0
+PTO_RUN = (1, 2, 3, 4)  # PTO_RUN[k - 1]: previous k workdays were PTO
+OFF_ATTACHED = 5  # weekend/holiday joined to PTO taken before it
+OFF_ALONE = 6  # weekend/holiday not joined to any PTO
+OFF_PENDING = 7  # weekend/holiday that PTO right after it will join
+N_STATES = 8
+
+
+def _shift(values):
+    """Values after spending one more PTO day this month (last axis is the month's PTO count)."""
+    shifted = np.full_like(values, -np.inf)
+    shifted[..., 1:] = values[..., :-1]
+    return shifted
+
+
+def _best(candidates, shape):
+    """Element-wise max over (previous state, took PTO, values) candidates, with backpointers."""
+    stacked = np.stack([np.broadcast_to(values, shape) for _, _, values in candidates])
+    choice = stacked.argmax(axis=0)
+    codes = np.array([prev * 2 + took for prev, took, _ in candidates], dtype=np.int8)
+    return np.take_along_axis(stacked, choice[None], axis=0)[0], codes[choice]
+
+
+def _month_values(off, blocked, valid, month_cap):
+    """Best break score of every month for each (entering state, final state, PTO taken that month).
+
+    off, blocked and valid are (months, 31) day grids; days past the end of a month
+    (not valid) keep the state. Runs the day-by-day search for all months and entering
+    states at once and returns (values, backpointers) with values shaped
+    (months, N_STATES, N_STATES, month_cap + 1).
+    """
+    n_months = len(off)
+    shape = (n_months, N_STATES, month_cap + 1)
+    values = np.full((N_STATES,) + shape, -np.inf)
+    for s in range(N_STATES):
+        values[s, :, s, 0] = 0.0
+    backpointers = np.empty((off.shape[1], N_STATES) + shape, dtype=np.int8)
+
+    for t in range(off.shape[1]):
+        # (months, 1, 1) masks of the day kind, broadcast over entering state and PTO count
+        is_off = (off[:, t] & valid[:, t])[:, None, None]
+        is_work = (~off[:, t] & valid[:, t])[:, None, None]
+        can_take = is_work & ~blocked[:, t][:, None, None]
+        padding = ~valid[:, t][:, None, None]
+
+        def when(mask, value):
+            return np.where(mask, value, -np.inf)
+
+        candidates = [[(s, 0, when(padding, values[s]))] for s in range(N_STATES)]
+        candidates[OFF_ALONE] += [(s, 0, when(is_off, values[s])) for s in (OFFICE, OFF_ALONE)]
+        candidates[OFF_PENDING] += [(s, 0, when(is_off, values[s] + 1)) for s in (OFFICE, OFF_PENDING)]
+        candidates[OFF_ATTACHED] += [(s, 0, when(is_off, values[s] + 1)) for s in PTO_RUN + (OFF_ATTACHED,)]
+        candidates[OFFICE] += [(s, 0, when(is_work, values[s]))
+                               for s in (OFFICE,) + PTO_RUN + (OFF_ATTACHED, OFF_ALONE)]
+        candidates[PTO_RUN[0]] += [(s, 1, when(can_take, _shift(values[s]) + 1))
+                                   for s in (OFFICE, OFF_ATTACHED, OFF_ALONE, OFF_PENDING)]
+        for k in range(1, MAX_CONSECUTIVE_PTO):
+            candidates[PTO_RUN[k]].append((PTO_RUN[k - 1], 1, when(can_take, _shift(values[PTO_RUN[k - 1]]) + 1)))
+
+        new_values = np.empty_like(values)
+        for s in range(N_STATES):
+            new_values[s], backpointers[t, s] = _best(candidates[s], shape)
+        values = new_values
+
+    # (months, entering state, final state, PTO)
+    return values.transpose(1, 2, 0, 3), backpointers
+
+
+def _breaks(days, off, pto):
+    """Runs of consecutive days off that contain at least one PTO day."""
+    breaks = []
+    free = off | pto
+    i = 0
+    while i < len(days):
+        if not free[i]:
+            i += 1
+            continue
+        j = i
+        while j + 1 < len(days) and free[j + 1]:
+            j += 1
+        if pto[i:j + 1].any():
+            breaks.append({
+                'Start': days[i],
+                'End': days[j],
+                'Days Off': j - i + 1,
+                'PTO Days': int(pto[i:j + 1].sum()),
+            })
+        i = j + 1
+    return breaks
+
+
+def optimize_pto_plan(start_date, end_date, pto_days, rto_percentage, pto_accounting_policy,
+                      extended_christmas_break, planned_pto=None, calendar=DEFAULT_CALENDAR):
+    """Choose dates for `pto_days` whole PTO days between the months of the date range.
+
+    `planned_pto` optionally maps 'YYYY-MM' to PTO already planned for that month
+    (not tied to dates); it counts towards each month's office days but is not moved.
+    `calendar` names the holiday calendar (see calendars.available_calendars).
+
+    Returns a dict with the chosen 'pto_dates', the resulting 'monthly_pto' and
+    'monthly_data' rows, and the 'breaks' the PTO creates.
+    """
+    planned_pto = planned_pto or {}
+    monthly_workdays = calculate_monthly_workdays(start_date, end_date, extended_christmas_break, calendar)
+    if not monthly_workdays:
+        return {'pto_dates': [], 'monthly_pto': {}, 'monthly_data': [], 'breaks': []}
+
+    months = list(monthly_workdays)
+    first = pd.Timestamp(months[0] + '-01')
+    last = pd.Timestamp(months[-1] + '-01') + pd.offsets.MonthEnd(0)
+    days = pd.date_range(first, last)
+
+    holiday_dates = get_custom_holidays(first, last, extended_christmas_break, calendar)['holiday_dates']
+    off = (days.weekday >= 5) | days.isin(holiday_dates)
+    blocked = (days.month == 12) & (days.day >= 24)
+
+    # Day grid of (month, day of month)
+    month_index = (days.year - first.year) * 12 + days.month - first.month
+    grid = (month_index, days.day - 1)
+    off_grid, blocked_grid, valid_grid = (np.zeros((len(months), 31), dtype=bool) for _ in range(3))
+    off_grid[grid], blocked_grid[grid], valid_grid[grid] = off, blocked, True
+
+    budget = max(int(pto_days), 0)
+    # More PTO in a month than its workdays outside Christmas week can't be placed
+    month_cap = min(budget, int((valid_grid & ~off_grid & ~blocked_grid).sum(axis=1).max()))
+    # Office days dominate; break length only breaks ties
+    office_weight = len(days) + 1
+
+    month_values, day_backpointers = _month_values(off_grid, blocked_grid, valid_grid, month_cap)
+    month_pto = np.arange(month_cap + 1) + np.array([planned_pto.get(month, 0.0) for month in months])[:, None]
+    workdays = np.array(list(monthly_workdays.values()), dtype=float)[:, None]
+    _, office_days = calculate_office_days(workdays, month_pto, rto_percentage, pto_accounting_policy)
+    month_values = month_values - office_weight * office_days[:, None, None, :]
+
+    # Chain the months: values[state, PTO used so far] at the end of each month
+    values = np.full((N_STATES, budget + 1), -np.inf)
+    values[OFFICE, 0] = 0.0
+    month_backpointers = np.empty((len(months), N_STATES, budget + 1), dtype=np.int32)
+    for m in range(len(months)):
+        # candidates[entering state, PTO this month, final state, PTO used]
+        before = np.full((N_STATES, month_cap + 1, budget + 1), -np.inf)
+        for k in range(month_cap + 1):
+            before[:, k, k:] = values[:, :budget + 1 - k]
+        candidates = before[:, :, None, :] + month_values[m].transpose(0, 2, 1)[..., None]
+        candidates = candidates.reshape(N_STATES * (month_cap + 1), N_STATES, budget + 1)
+        month_backpointers[m] = candidates.argmax(axis=0)
+        values = np.take_along_axis(candidates, month_backpointers[m][None], axis=0)[0]
+
+    # Pending days off at the end of the range never got their PTO
+    values[OFF_PENDING] = -np.inf
+    state, used = np.unravel_index(values.argmax(), values.shape)
+
+    pto_grid = np.zeros_like(off_grid)
+    for m in range(len(months) - 1, -1, -1):
+        entered, month_used = divmod(int(month_backpointers[m, state, used]), month_cap + 1)
+        used -= month_used
+        for t in range(off_grid.shape[1] - 1, -1, -1):
+            code = day_backpointers[t, state, m, entered, month_used]
+            state, took = divmod(int(code), 2)
+            if took:
+                pto_grid[m, t] = True
+                month_used -= 1
+    pto = pto_grid[grid]
+
+    pto_dates = list(days[pto])
+    monthly_pto = {month: float(planned_pto.get(month, 0.0)) for month in months}
+    for date in pto_dates:
+        monthly_pto[date.strftime('%Y-%m')] += 1
+
+    return {
+        'pto_dates': pto_dates,
+        'monthly_pto': monthly_pto,
+        'monthly_data': build_monthly_data(monthly_workdays, monthly_pto, rto_percentage, pto_accounting_policy),
+        'breaks': _breaks(days, off, pto),
+    }
@@ -0,0 +1,427 @@
+"""Small HTTP/JSON API for the holiday, workday and office-day calculations.
+
+Standard library only (ThreadingHTTPServer), so it runs anywhere rto_core does:
+
+    python rto_api.py --port 8000
+
+Endpoints (POST takes a JSON object, responses are JSON):
+
+    GET  /health
+    GET  /calendars          names accepted as holiday_calendar
+    GET  /metrics            Prometheus text (see metrics.py)
+    POST /holidays           {start_date, end_date, extended_christmas_break?, holiday_calendar?}
+    POST /monthly-workdays   same fields as /holidays
+    POST /office-days        same, plus rto_percentage?, pto_accounting_policy?, avg_pto?, monthly_pto?
+    POST /scenarios          {"scenarios": [{employee_id?, ...same fields as /office-days}, ...]}
+
+Defaults match the app and rto_batch.py: extended_christmas_break true, the
+"US (company)" calendar, 60% RTO, PTO subtracted from workdays, no PTO.
+monthly_pto maps 'YYYY-MM' to PTO days and overrides avg_pto for that month.
+
+Request bodies are normalized (dates parsed, defaults filled, numbers rounded)
+and the response is cached on the normalized body, so differently formatted but
+equivalent requests share a cache entry. Concurrent /office-days requests on the
+same calendar and policy are coalesced: the first one waits
+RTO_API_BATCH_WINDOW_MS for others to join and computes all of them as one
+employees x months array. /scenarios is vectorized the same way within the
+request (rto_batch.plan_chunk).
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from calendars import DEFAULT_CALENDAR, available_calendars
+from rto_batch import DEFAULT_RTO_PERCENTAGE, plan_chunk
+from rto_core import (PTO_ACCOUNTING_POLICIES, PTO_SUBTRACTED, calculate_monthly_workdays, calculate_office_days,
+                      get_custom_holidays)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = int(os.environ.get('RTO_API_PORT', 8000))
+BATCH_WINDOW_SECONDS = float(os.environ.get('RTO_API_BATCH_WINDOW_MS', 2)) / 1000
+MAX_BODY_BYTES = int(os.environ.get('RTO_API_MAX_BODY_BYTES', 10 * 1024 * 1024))
+MAX_SCENARIOS = int(os.environ.get('RTO_API_MAX_SCENARIOS', 10000))
+# Longest date range accepted; each calendar year is compiled to disk on first use
+MAX_YEARS = int(os.environ.get('RTO_API_MAX_YEARS', 50))
+
+
+class RequestError(ValueError):
+    """Bad request input; the message is returned to the client with `status`."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _date(body, field):
+    if field not in body:
+        raise RequestError(f"{field} is required")
+    # Only strings: pd.Timestamp would read a number like 20250101 as nanoseconds since 1970
+    if not isinstance(body[field], str):
+        raise RequestError(f"{field} must be a date like 2025-01-31")
+    try:
+        value = pd.Timestamp(body[field])
+    except (TypeError, ValueError):
+        raise RequestError(f"{field} must be a date like 2025-01-31") from None
+    if pd.isna(value):
+        raise RequestError(f"{field} must be a date like 2025-01-31")
+    return value.normalize().strftime('%Y-%m-%d')
+
+
+def _number(body, field, default, low=0.0, high=None):
+    value = body.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(f"{field} must be a number")
+    if value < low or (high is not None and value > high):
+        raise RequestError(f"{field} must be between {low:g} and {high:g}" if high is not None
+                           else f"{field} must be at least {low:g}")
+    return round(float(value), 6)
+
+
+def normalize_calendar_request(body):
+    """Date range and calendar fields of a request, validated and with defaults filled."""
+    if not isinstance(body, dict):
+        raise RequestError("request body must be a JSON object")
+    start_date, end_date = _date(body, 'start_date'), _date(body, 'end_date')
+    if end_date < start_date:
+        raise RequestError("end_date is before start_date")
+    if int(end_date[:4]) - int(start_date[:4]) >= MAX_YEARS:
+        raise RequestError(f"date ranges are limited to {MAX_YEARS} years")
+    extended_christmas_break = body.get('extended_christmas_break', True)
+    if not isinstance(extended_christmas_break, bool):
+        raise RequestError("extended_christmas_break must be true or false")
+    holiday_calendar = body.get('holiday_calendar', DEFAULT_CALENDAR)
+    if not isinstance(holiday_calendar, str) or holiday_calendar not in available_calendars():
+        raise RequestError(f"unknown holiday_calendar {holiday_calendar!r}, see GET /calendars")
+    return {'start_date': start_date, 'end_date': end_date, 'extended_christmas_break': extended_christmas_break,
+            'holiday_calendar': holiday_calendar}
+
+
+def normalize_scenario(body):
+    """One employee scenario: the calendar fields plus RTO %, policy and PTO."""
+    scenario = normalize_calendar_request(body)
+    policy = body.get('pto_accounting_policy', PTO_SUBTRACTED)
+    if policy not in PTO_ACCOUNTING_POLICIES:
+        raise RequestError(f"pto_accounting_policy must be one of {PTO_ACCOUNTING_POLICIES}")
+    monthly_pto = body.get('monthly_pto') or {}
+    if not isinstance(monthly_pto, dict):
+        raise RequestError("monthly_pto must map 'YYYY-MM' to PTO days")
+    for month in monthly_pto:
+        if not re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', month):
+            raise RequestError(f"monthly_pto key {month!r} is not a 'YYYY-MM' month")
+    scenario.update({
+        'rto_percentage': _number(body, 'rto_percentage', DEFAULT_RTO_PERCENTAGE, high=100.0),
+        'pto_accounting_policy': policy,
+        'avg_pto': _number(body, 'avg_pto', 0.0),
+        'monthly_pto': {month: _number(monthly_pto, month, 0.0) for month in sorted(monthly_pto)},
+    })
+    if 'employee_id' in body:
+        scenario['employee_id'] = body['employee_id']
+    return scenario
+
+
+class Coalescer:
+    """Merges concurrent calls that share a key into one batched computation.
+
+    The first caller for a key waits `window_seconds` for others to join, then
+    runs `compute(key, items)` once for the whole batch (a list of results in
+    item order) on its own thread and hands each caller its result.
+    """
+
+    def __init__(self, compute, window_seconds=BATCH_WINDOW_SECONDS, max_batch=1024):
+        self.compute = compute
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batches = {}  # key -> [(item, future)] still open for joining
+
+    def __call__(self, key, item):
+        future = Future()
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._batches[key] = []
+            batch.append((item, future))
+            if len(batch) >= self.max_batch:
+                del self._batches[key]
+        if leader:
+            self._run(key, batch)
+        return future.result()
+
+    def _run(self, key, batch):
+        if self.window_seconds:
+            time.sleep(self.window_seconds)
+        with self._lock:
+            if self._batches.get(key) is batch:
+                del self._batches[key]
+        metrics.incr('api_batches_total')
+        metrics.incr('api_batched_items_total', len(batch))
+        try:
+            results = self.compute(key, [item for item, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+        else:
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+def _month_rows(months, workdays, pto, net_days, office_days):
+    """Monthly table rows in the app's / rto_batch's column names."""
+    labels = pd.to_datetime(months, format='%Y-%m').strftime('%b %Y')
+    return [{'Month': label, 'Work Days': float(w), 'PTO Days': float(p), 'Net Work Days': float(n),
+             'Office Days Required': float(o)}
+            for label, w, p, n, o in zip(labels, workdays, pto, net_days, office_days)]
+
+
+def _office_days_batch(key, scenarios):
+    start_date, end_date, extended_christmas_break, holiday_calendar, policy = key
+    monthly_workdays = calculate_monthly_workdays(pd.Timestamp(start_date), pd.Timestamp(end_date),
+                                                  extended_christmas_break, holiday_calendar)
+    months = list(monthly_workdays)
+    workdays = np.array(list(monthly_workdays.values()), dtype=float)
+    pto = np.array([[scenario['monthly_pto'].get(month, scenario['avg_pto']) for month in months]
+                    for scenario in scenarios], dtype=float).reshape(len(scenarios), len(months))
+    rto_percentage = np.array([scenario['rto_percentage'] for scenario in scenarios])[:, None]
+    net_days, office_days = calculate_office_days(workdays[None, :], pto, rto_percentage, policy)
+    return [{'months': _month_rows(months, workdays, pto[i], net_days[i], office_days[i]),
+             'total_office_days': float(office_days[i].sum())}
+            for i in range(len(scenarios))]
+
+
+def _shared_batch(compute):
+    """Coalescer compute for endpoints whose result depends only on the key: computed once, shared by all."""
+    def run(key, items):
+        result = compute(*key)
+        return [result] * len(items)
+    return run
+
+
+def _holidays(start_date, end_date, extended_christmas_break, holiday_calendar):
+    holiday_df = get_custom_holidays(pd.Timestamp(start_date), pd.Timestamp(end_date), extended_christmas_break,
+                                     holiday_calendar)['holiday_df']
+    return {'holidays': [{'date': f"{day:%Y-%m-%d}", 'name': name}
+                         for day, name in zip(holiday_df['Date'], holiday_df['Holiday Name'])]}
+
+
+def _monthly_workdays(start_date, end_date, extended_christmas_break, holiday_calendar):
+    monthly_workdays = calculate_monthly_workdays(pd.Timestamp(start_date), pd.Timestamp(end_date),
+                                                  extended_christmas_break, holiday_calendar)
+    return {'monthly_workdays': monthly_workdays, 'total': sum(monthly_workdays.values())}
+
+
+_office_days = Coalescer(_office_days_batch)
+_holidays_coalesced = Coalescer(_shared_batch(_holidays))
+_monthly_workdays_coalesced = Coalescer(_shared_batch(_monthly_workdays))
+
+
+def _calendar_key(request):
+    return request['start_date'], request['end_date'], request['extended_christmas_break'], request['holiday_calendar']
+
+
+def holidays_endpoint(request):
+    return _holidays_coalesced(_calendar_key(request), request)
+
+
+def monthly_workdays_endpoint(request):
+    return _monthly_workdays_coalesced(_calendar_key(request), request)
+
+
+def office_days_endpoint(request):
+    return _office_days(_calendar_key(request) + (request['pto_accounting_policy'],), request)
+
+
+def scenarios_endpoint(request):
+    scenarios = request['scenarios']
+    if not scenarios:
+        return {'results': []}
+    df = pd.DataFrame([{key: value for key, value in scenario.items() if key not in ('employee_id', 'monthly_pto')}
+                       for scenario in scenarios])
+    # plan_chunk keys its output rows on employee_id, so use the position and map the caller's ids back after
+    df['employee_id'] = np.arange(len(scenarios))
+    for month in sorted({month for scenario in scenarios for month in scenario['monthly_pto']}):
+        df[f'pto_{month}'] = [scenario['monthly_pto'].get(month, np.nan) for scenario in scenarios]
+    plans = plan_chunk(df)
+    # One pass over the whole result instead of a DataFrame per scenario
+    ids = plans['employee_id'].to_numpy(dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    columns = [column for column in plans.columns if column != 'employee_id']
+    rows = [dict(zip(columns, values))
+            for values in zip(*(plans[column].to_numpy()[order].tolist() for column in columns))]
+    offsets = np.r_[0, np.cumsum(np.bincount(ids, minlength=len(scenarios)))]
+    totals = np.bincount(ids, weights=plans['Office Days Required'].to_numpy(dtype=float), minlength=len(scenarios))
+    results = [{'employee_id': scenario.get('employee_id', i),
+                'months': rows[offsets[i]:offsets[i + 1]],
+                'total_office_days': float(totals[i])}
+               for i, scenario in enumerate(scenarios)]
+    return {'results': results}
+
+
+def _normalize_scenarios(body):
+    if not isinstance(body, dict) or not isinstance(body.get('scenarios'), list):
+        raise RequestError('request body must be {"scenarios": [...]}')
+    if len(body['scenarios']) > MAX_SCENARIOS:
+        raise RequestError(f"at most {MAX_SCENARIOS} scenarios per request", status=413)
+    scenarios = []
+    for i, scenario in enumerate(body['scenarios']):
+        try:
+            scenarios.append(normalize_scenario(scenario))
+        except RequestError as exc:
+            raise RequestError(f"scenarios[{i}]: {exc}", exc.status) from None
+    return {'scenarios': scenarios}
+
+
+# path -> (normalize request body, compute response)
+ENDPOINTS = {
+    '/holidays': (normalize_calendar_request, holidays_endpoint),
+    '/monthly-workdays': (normalize_calendar_request, monthly_workdays_endpoint),
+    '/office-days': (normalize_scenario, office_days_endpoint),
+    '/scenarios': (_normalize_scenarios, scenarios_endpoint),
+}
+
+
+class ResponseCache:
+    """In-memory LRU of encoded responses, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+        metrics.incr('api_cache_requests_total', result='miss' if value is None else 'hit')
+        return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes // 8:
+            return  # one huge bulk response would push everything else out
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+response_cache = ResponseCache(int(os.environ.get('RTO_API_CACHE_ENTRIES', 4096)),
+                               int(os.environ.get('RTO_API_CACHE_MB', 64)) * 1024 * 1024)
+
+
+def handle(path, body):
+    """Encoded JSON response for a POST of `body` (already decoded) to `path`; raises RequestError."""
+    if path not in ENDPOINTS:
+        raise RequestError(f"unknown endpoint {path}", status=404)
+    normalize, compute = ENDPOINTS[path]
+    request = normalize(body)
+    cache_key = path + json.dumps(request, sort_keys=True, separators=(',', ':'))
+    response = response_cache.get(cache_key)
+    if response is None:
+        response = json.dumps(compute(request), separators=(',', ':')).encode('utf-8')
+        response_cache.set(cache_key, response)
+    return response
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients can reuse a connection
+    # Headers and body are separate writes; without TCP_NODELAY the body waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def _endpoint(self):
+        """Request path for metric labels; unknown paths share one label."""
+        path = self.path.split('?')[0]
+        return path if path in ENDPOINTS or path in ('/health', '/calendars', '/metrics') else 'other'
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        with metrics.span('api_request', endpoint=self._endpoint()):
+            if path == '/health':
+                self._send(200, b'{"status":"ok"}')
+            elif path == '/calendars':
+                self._send(200, json.dumps({'calendars': list(available_calendars())}).encode('utf-8'))
+            elif path == '/metrics':
+                self._send(200, metrics.prometheus_text().encode('utf-8'), 'text/plain; version=0.0.4')
+            else:
+                self._send_error(404, f"unknown endpoint {path}")
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        with metrics.span('api_request', endpoint=self._endpoint()):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY_BYTES:
+                self._send_error(413, f"request body over {MAX_BODY_BYTES} bytes")
+                self.close_connection = True
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b'null')
+            except ValueError:
+                self._send_error(400, "request body is not valid JSON")
+                return
+            try:
+                self._send(200, handle(path, body))
+            except RequestError as exc:
+                self._send_error(exc.status, str(exc))
+            except Exception:
+                logger.exception("%s failed", path)
+                self._send_error(500, "internal error")
+
+    def _send(self, status, body, content_type='application/json'):
+        metrics.incr('api_requests_total', endpoint=self._endpoint(), status=status)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode('utf-8'))
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host='127.0.0.1', port=DEFAULT_PORT):
+    """ThreadingHTTPServer for the API (port 0 picks a free port); call serve_forever() on it."""
+    server = ThreadingHTTPServer((host, port), APIHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the RTO calculations as a JSON API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to bind (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port (default RTO_API_PORT or 8000)")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,90 +1,79 @@
-import asyncio
 import streamlit as st
-import holidays as hd
-import math
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.express as px
-from pandas.tseries.holiday import USFederalHolidayCalendar
+import logging
 import os
-from math_tool import calculator_tool
-
-databricks_key = st.secrets['general']["DATABRICKS_API_KEY"]
-
-def get_custom_holidays(start_date, end_date, extended_christmas_break):
-    start = pd.to_datetime(start_date)
-    end = pd.to_datetime(end_date)
-
-    # Initialize US holidays
-    us_holidays = hd.US(years=range(start_date.year, end_date.year + 1))
-
-    # Get federal holidays from the `holidays` module
-    federal_holidays = {date: name for date, name in us_holidays.items() if start <= pd.to_datetime(date) <= end}
-
-    # Compute additional holidays
-    additional_holidays = {}
-
-    year = start_date.year
-    thanksgiving = pd.to_datetime(pd.date_range(start=f"{year}-11-01", end=f"{year}-11-30", freq="W-THU")[3])
-   
-    if start <= thanksgiving <= end:
-        day_after_thanksgiving = thanksgiving + timedelta(days=1)
-        additional_holidays[day_after_thanksgiving] = "Day After Thanksgiving"
-
-    # Add Christmas Break (Dec 24–Dec 31, skipping weekends)
-    if extended_christmas_break:
-        christmas_break = pd.date_range(start=f"{year}-12-24", end=f"{year}-12-31")
-        christmas_break = christmas_break[~christmas_break.weekday.isin([5, 6])]
-        #exclude Christmas day from the extended break to avoid duplicate
-        christmas = pd.to_datetime(f'{year}-12-25')
-        christmas_break = christmas_break[~christmas_break.isin([christmas])]
-
-        for date in christmas_break:
-            if start <= date <= end:
-                additional_holidays[date] = "Christmas Break"
-
-    # Merge all holidays
-    all_holidays = {**federal_holidays, **additional_holidays}
-
-    # Convert to DataFrame
-    holiday_df = pd.DataFrame(list(all_holidays.items()), columns=["Date", "Holiday Name"])
-    holiday_df["Date"] = pd.to_datetime(holiday_df["Date"])
-
-    holiday_df_sorted = holiday_df.sort_values("Date").reset_index(drop=True)
-
-    holiday_result_dict = {
-        'holiday_df': holiday_df_sorted,
-        'holiday_dates': holiday_df_sorted["Date"]
-    }
-    return holiday_result_dict
-
-def calculate_workdays(start_date, end_date):
-    """Calculate number of workdays between two dates, excluding US federal holidays."""
-    holidays = get_custom_holidays(start_date, end_date, extended_christmas_break)['holiday_dates']
-    
-    # Create date range and convert to dataframe
-    date_range = pd.date_range(start=start_date, end=end_date)
-    df = pd.DataFrame(index=date_range)
-    
-    # Filter out weekends and holidays
-    workdays = df[~df.index.isin(holidays) & 
-                 ~df.index.weekday.isin([5, 6])].shape[0]
-    
-    return workdays
-
-def calculate_monthly_workdays(start_date, end_date):
-    """Calculate workdays for each month in the date range."""
-    months = pd.date_range(start=start_date, end=end_date, freq='ME')
-    monthly_workdays = {}
-    
-    for month in months:
-        month_start = month.replace(day=1)
-        month_end = month
-        workdays = calculate_workdays(month_start, month_end)
-        monthly_workdays[month.strftime('%Y-%m')] = workdays
-    
-    return monthly_workdays
+import time
+from contextlib import closing
+import metrics
+from ai_prompt import build_ai_prompt, build_precomputed_context, format_pto_plan, required_office_days_formula
+from calendars import available_calendars
+from charts import MAX_HEATMAP_YEARS, calendar_heatmap, day_categories, monthly_chart
+from llm_runtime import QueueFullError
+from math_tool import (CANDIDATE_TEMPERATURES, DIRECT_MODE, TOOL_MODE, generate_candidates, make_cache_key,
+                       get_response_cache, request_stats, stream_calculator_tool)
+from plan_check import check_plan, parse_plan, rank_candidates
+from pto_optimizer import optimize_pto_plan
+from rto_core import (PTO_ACCOUNTING_POLICIES, build_monthly_data, calculate_monthly_workdays,
+                      calculate_workdays, get_custom_holidays, get_day_calendar, office_day_lookup, period_table,
+                      scenario_sweep)
+
+logger = logging.getLogger(__name__)
+
+# Drafts written at once when comparing AI plans, and how long to wait for them in total
+AI_CANDIDATES = int(os.environ.get('RTO_AI_CANDIDATES', len(CANDIDATE_TEMPERATURES)))
+AI_CANDIDATE_BUDGET_SECONDS = float(os.environ.get('RTO_AI_CANDIDATE_BUDGET_SECONDS', 60))
+
+# Calendar math memoized on its inputs, shared across sessions and reruns; st.cache_data hands
+# each caller its own copy, so the results can be modified freely
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_holidays(start_date, end_date, extended_christmas_break, holiday_calendar):
+    return get_custom_holidays(start_date, end_date, extended_christmas_break, holiday_calendar)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_workdays(start_date, end_date, extended_christmas_break, holiday_calendar):
+    return calculate_workdays(start_date, end_date, extended_christmas_break, holiday_calendar)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_monthly_workdays(start_date, end_date, extended_christmas_break, holiday_calendar):
+    return calculate_monthly_workdays(start_date, end_date, extended_christmas_break, holiday_calendar)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_period_table(months, extended_christmas_break, holiday_calendar, monthly_pto, freq, rto_percentage,
+                      pto_accounting_policy):
+    """Quarterly / rolling table for the months' date range with `monthly_pto` spread over each month."""
+    calendar = get_day_calendar(pd.Timestamp(months[0] + "-01"),
+                                pd.Timestamp(months[-1] + "-01") + pd.offsets.MonthEnd(0),
+                                extended_christmas_break, holiday_calendar)
+    calendar = calendar.with_pto(monthly_pto=monthly_pto)
+    return period_table(calendar, freq, rto_percentage, pto_accounting_policy)
+
+# Figures are cached on their data like the tables above, so a rerun that doesn't change them
+# (switching tabs, typing AI criteria) reuses the built figure
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_monthly_chart(monthly_data, months, granularity):
+    return monthly_chart(monthly_data, months, granularity)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_calendar_heatmap(months, extended_christmas_break, holiday_calendar, monthly_pto, rto_percentage,
+                          pto_accounting_policy, years):
+    days, categories = day_categories(months, extended_christmas_break, monthly_pto, rto_percentage,
+                                      pto_accounting_policy, holiday_calendar)
+    return calendar_heatmap(days, categories, years)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_scenario_sweep(monthly_workdays):
+    return scenario_sweep(monthly_workdays,
+                          rto_percentages=np.arange(0, 101, 5),
+                          avg_pto_values=np.arange(0, 7.01, 0.5))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_pto_plan(start_date, end_date, pto_days, rto_percentage, pto_accounting_policy, extended_christmas_break,
+                  planned_pto, holiday_calendar):
+    return optimize_pto_plan(start_date, end_date, pto_days, rto_percentage, pto_accounting_policy,
+                             extended_christmas_break, planned_pto, holiday_calendar)
 
 def display_metrics_and_charts(monthly_data, monthly_workdays, holidays):
     """Display metrics and charts based on the calculated data."""
@@ -108,33 +97,63 @@ def display_metrics_and_charts(monthly_data, monthly_workdays, holidays):
     row2_col2.metric("Avg Monthly Office Days", f"{avg_monthly_office_days:.1f}")
     
     # Create tabs for table and chart
-    chart_tab, table_tab = st.tabs(["Monthly Visualization", "Detailed Monthly Table"])
+    chart_tab, heatmap_tab, table_tab, quarter_tab, rolling_tab, sweep_tab = st.tabs(
+        ["Monthly Visualization", "Calendar Heatmap", "Detailed Monthly Table", "Quarterly View",
+         "Rolling 12-Week Windows", "Scenario Sweep"])
     
     # Convert data to DataFrame
     df = pd.DataFrame(monthly_data)
+    months = tuple(monthly_workdays)
+    monthly_pto = {month: row['PTO Days'] for month, row in zip(months, monthly_data)}
     
-    # Show chart in first tab
-    with chart_tab:
-        fig = px.bar(df, 
-                    x='Month', 
-                    y=['Office Days Required', 'PTO Days'],
-                    title='Monthly Office Days Required vs PTO',
-                    barmode='group')
-        fig.update_layout(
-            xaxis_title="Month",
-            yaxis_title="Days",
-            legend_title="Category",
-            height=500  # Make the chart a bit taller
-        )
+    # Show chart in first tab; long ranges are summed per quarter or year so the bars stay readable
+    with chart_tab, metrics.span('monthly_chart'):
+        granularity = st.radio("Group by", ["Auto", "Month", "Quarter", "Year"], horizontal=True,
+                               key="chart_granularity")
+        fig = load_monthly_chart(monthly_data, months, granularity)
+        st.plotly_chart(fig, use_container_width=True)
+
+    with heatmap_tab, metrics.span('calendar_heatmap'):
+        years = list(range(int(months[0][:4]), int(months[-1][:4]) + 1))
+        if len(years) > MAX_HEATMAP_YEARS:
+            first_year = st.select_slider("First year shown", years[:len(years) - MAX_HEATMAP_YEARS + 1],
+                                          key="heatmap_first_year")
+            years = years[years.index(first_year):years.index(first_year) + MAX_HEATMAP_YEARS]
+        st.caption("Holidays and weekends are from the holiday calendar. Office and PTO days are entered as "
+                   "counts per month, so they are shown on an example set of dates.")
+        fig = load_calendar_heatmap(months, st.session_state.extended_christmas_break,
+                                    st.session_state.holiday_calendar, monthly_pto,
+                                    st.session_state.workdays_percentage,
+                                    st.session_state.pto_accounting_policy, tuple(years))
         st.plotly_chart(fig, use_container_width=True)
 
     # Show table in second tab
     with table_tab:
         st.dataframe(df, hide_index=True, use_container_width=True)
+
+    # Quarterly and rolling-window views come from the day-level calendar
+    with quarter_tab, metrics.span('period_table', freq='Q'):
+        quarterly_df = load_period_table(months, st.session_state.extended_christmas_break,
+                                         st.session_state.holiday_calendar, monthly_pto, 'Q',
+                                         st.session_state.workdays_percentage,
+                                         st.session_state.pto_accounting_policy)
+        st.dataframe(quarterly_df, hide_index=True, use_container_width=True)
+    with rolling_tab, metrics.span('period_table', freq='12W'):
+        st.caption("Every 12-week window starting on a Monday. PTO entered per month is spread evenly over "
+                   "that month's workdays.")
+        rolling_df = load_period_table(months, st.session_state.extended_christmas_break,
+                                       st.session_state.holiday_calendar, monthly_pto, '12W',
+                                       st.session_state.workdays_percentage,
+                                       st.session_state.pto_accounting_policy)
+        st.dataframe(rolling_df, hide_index=True, use_container_width=True)
+
+    with sweep_tab, metrics.span('scenario_sweep'):
+        show_scenario_sweep(monthly_workdays)
     
     with st.container(border = True):
-        st.subheader("✨ Use AI to help for PTO Planning ✨")
-        st.write("AI can make mistake, use the feature carefully and verify the result.")
+        st.subheader("✨ PTO Planning Assistant ✨")
+        st.write("Get a suggested PTO plan instantly, or describe extra criteria and let AI plan around them. "
+                 "AI can make mistake, use the feature carefully and verify the result.")
         ai_pto_factor = st.radio("Do you want AI to factor in PTO you have already planned (entered)?", 
                 ["Yes, and plan additional PTOs", "No, help me plan from scratch"],
                 key="ai_pto_factor")
@@ -147,97 +166,227 @@ def display_metrics_and_charts(monthly_data, monthly_workdays, holidays):
                 step = 0.5, 
                 key="ai_pto_days"
             )
-            monthly_data = []
-            for month, workdays in monthly_workdays.items():
-                if st.session_state.pto_accounting_policy == 'PTO subtracted from workdays':
-                    net_days = workdays
-                    office_days = math.floor(net_days * 0.6, 0)
-                else:
-                    net_days = workdays
-                    office_days = math.floor(net_days * 0.6, 0)
-                monthly_data.append({
-                    'Month': pd.to_datetime(month + "-01").strftime("%b %Y"),
-                    'Work Days': workdays,
-                    'PTO Days': 0,
-                    'Net Work Days': net_days,
-                    'Office Days Required': office_days
-                })
-            
+            monthly_data = build_monthly_data(monthly_workdays, 0.0, st.session_state.workdays_percentage,
+                                              st.session_state.pto_accounting_policy)
+
         st.text_input(label="What other criteria do you want AI to consider?",
                     placeholder='eg. I want to take 2 weeks off in July',
                     key="ai_pto_additional_criteria")
         
+        pto_allowance=st.session_state.pto_allowance
+        if st.session_state.ai_pto_factor == "No, help me plan from scratch":
+            planned_pto, plan_pto_days = None, min(st.session_state.ai_pto_days, pto_allowance)
+            if st.session_state.ai_pto_days > pto_allowance:
+                st.warning(f"Planning {pto_allowance:g} PTO days, your PTO allowance.")
+        else:
+            planned_pto = {month: row['PTO Days'] for month, row in zip(monthly_workdays, monthly_data)}
+            plan_pto_days = pto_allowance - st.session_state.total_pto
+
         additional_info =f"""
         Here is the additional info to consider:
 
-        Total PTO I want to take: {st.session_state.ai_pto_days}
+        Total PTO I want to take: {min(st.session_state.ai_pto_days, pto_allowance)}
 
         Additional criteria: {st.session_state.ai_pto_additional_criteria}
         """
-        pto_allowance=st.session_state.pto_allowance
-        office_day_formula = required_office_days_formula(st.session_state.pto_accounting_policy)
-        show_ai_button(monthly_data, monthly_workdays, holidays, additional_info, pto_allowance, office_day_formula)
-
-def show_ai_button(monthly_data, monthly_workdays, holidays, additional_info=None, pto_allowance=None, office_day_formula=None):
-    if st.button("🪄AI Suggest PTO Plan", type='primary'):
-        with st.spinner("Thinking...feel free to grab a beverage while you wait"):
-            prompt = f"""
-            Use the monthly data and holidays to help me optimize my PTO plan.
-            I have a total {pto_allowance} number of PTO days to take in this period.
-
-            Focus on which month I should take PTO to minimize the total office days required.
-            Factor in weekends and company holidays to maximize day offs.
-            Do not suggest day offs between Christmas and New year since this is already a company holiday.
-            Also avoid suggesting taking day off for a whole week if I need to take Monday to Friday off using PTOs.
-
-            Here is the monthly data of how many work days, holidays, PTO days and office days required for each month:
-            {monthly_data}\n
-
-            Here are the company holidays during this period:
-            {holidays}\n
-
-            Here are additional criteria I want you to consider:
-            {additional_info}\n
-
-            Use this formula and calculator tool to calculate the required office days:\n
-            {office_day_formula}
-
-            Think carefully about my additional criteria, understand what it means before you give me suggestions.
-
-            Use this format for your suggestions:\n
-            **Overall summary**: \n
-            [summary of the strategy]
-
-            PTO strategy by month:
-            - Month: [Month]
-             - PTO Days: [Number of PTO Days]
-             - Total required office days: [Number of days to go into office subtracting the suggested PTO and holidays]
-             - Dates to take: [Dates to take PTO to maximize day offs including weekends and holidays]
-            """
-            output = asyncio.run(calculator_tool(prompt))
-            formatted_output = output[-1].content
-        
-        st.markdown(f"**AI Suggested PTO Plan**:\n {formatted_output}")        
+        office_day_formula = required_office_days_formula(st.session_state.pto_accounting_policy,
+                                                          st.session_state.workdays_percentage)
+        show_local_plan_button(monthly_workdays, planned_pto, plan_pto_days)
+        show_ai_button(monthly_data, monthly_workdays, holidays, additional_info, pto_allowance, office_day_formula,
+                       planned_pto, plan_pto_days)
+
+def show_scenario_sweep(monthly_workdays):
+    """Heatmap and table of office days across RTO %, average PTO and both accounting policies."""
+    sweep_df = load_scenario_sweep(monthly_workdays)
+    sweep_df['Within PTO Allowance'] = sweep_df['Total PTO'] <= st.session_state.pto_allowance
+
+    policy = st.radio("Accounting policy", PTO_ACCOUNTING_POLICIES, horizontal=True, key="sweep_policy",
+                      index=PTO_ACCOUNTING_POLICIES.index(st.session_state.pto_accounting_policy))
+    policy_df = sweep_df[sweep_df['Policy'] == policy]
+    grid = policy_df.pivot(index='RTO %', columns='Avg PTO per Month', values='Total Office Days')
+    fig = px.imshow(grid,
+                    labels={'x': "Avg PTO per month", 'y': "RTO %", 'color': "Total office days"},
+                    title=f'Total Required Office Days ({policy})',
+                    aspect='auto',
+                    origin='lower',
+                    text_auto=True)
+    fig.update_layout(height=600)
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(policy_df, hide_index=True, use_container_width=True)
+
+def suggest_local_plan(monthly_workdays, planned_pto, pto_days):
+    months = list(monthly_workdays)
+    return load_pto_plan(pd.Timestamp(months[0] + "-01"),
+                         pd.Timestamp(months[-1] + "-01") + pd.offsets.MonthEnd(0),
+                         pto_days,
+                         st.session_state.workdays_percentage,
+                         st.session_state.pto_accounting_policy,
+                         st.session_state.extended_christmas_break,
+                         planned_pto,
+                         st.session_state.holiday_calendar)
+
+def show_local_plan_button(monthly_workdays, planned_pto, pto_days):
+    if st.button("⚡Suggest PTO Plan", type='primary',
+                 help="Instant plan computed locally from the holiday calendar and the office day formula"):
+        plan = suggest_local_plan(monthly_workdays, planned_pto, pto_days)
+        st.markdown(f"**Suggested PTO Plan**:\n\n{format_pto_plan(plan)}")
+
+def precompute_ai_context(monthly_workdays, planned_pto, pto_days):
+    """Every office-day figure the AI needs, so it can answer in a single call without the calculator."""
+    plan = suggest_local_plan(monthly_workdays, planned_pto, pto_days)
+    lookup = office_day_lookup(monthly_workdays,
+                               st.session_state.workdays_percentage,
+                               st.session_state.pto_accounting_policy,
+                               planned_pto)
+    return build_precomputed_context(plan, lookup)
+
+def show_ai_button(monthly_data, monthly_workdays, holidays, additional_info=None, pto_allowance=None,
+                   office_day_formula=None, planned_pto=None, plan_pto_days=None):
+    st.checkbox("Compare several AI drafts and show the best one that checks out", key="ai_candidates",
+                help="Writes a few drafts at once and checks each against the holiday calendar, the office-day "
+                     "formula and your PTO allowance. Takes about as long as a single draft.")
+    if st.button("🪄AI Suggest PTO Plan",
+                 disabled=not st.session_state.ai_pto_additional_criteria,
+                 help="Only needed for free-text criteria, the plan above covers everything else"):
+        # Same holidays, with names for the prompt (served from load_holidays)
+        holiday_df = holidays
+        if len(holidays):
+            holiday_df = load_holidays(holidays.min(), holidays.max(),
+                                       st.session_state.extended_christmas_break,
+                                       st.session_state.holiday_calendar)['holiday_df']
+        tool_prompt = build_ai_prompt(monthly_data, holiday_df, additional_info, pto_allowance, office_day_formula)
+        # Single LLM call with the arithmetic done up front; the calculator tool chain is the fallback
+        try:
+            precomputed = precompute_ai_context(monthly_workdays, planned_pto, plan_pto_days)
+        except Exception:
+            logger.warning("Precomputing the AI context failed, falling back to the calculator tool", exc_info=True)
+            metrics.incr('ai_precompute_failures_total')
+            mode, prompt = TOOL_MODE, tool_prompt
+        else:
+            mode, prompt = DIRECT_MODE, build_ai_prompt(monthly_data, holiday_df, additional_info, pto_allowance,
+                                                        office_day_formula, precomputed)
+        cache_key = make_cache_key(monthly_data=monthly_data,
+                                   holidays=list(holidays),
+                                   pto_accounting_policy=st.session_state.pto_accounting_policy,
+                                   rto_percentage=st.session_state.workdays_percentage,
+                                   holiday_calendar=st.session_state.holiday_calendar,
+                                   pto_allowance=pto_allowance,
+                                   pto_days=st.session_state.ai_pto_days,
+                                   plan_pto_days=plan_pto_days,
+                                   criteria=st.session_state.ai_pto_additional_criteria,
+                                   mode=mode,
+                                   candidates=st.session_state.ai_candidates)
+        if st.session_state.ai_candidates:
+            show_ai_candidates(mode, prompt, tool_prompt, cache_key, monthly_workdays, planned_pto, pto_allowance)
+            return
+
+        status = st.status("Working out the numbers...")
+        st.markdown("**AI Suggested PTO Plan**:")
+        try:
+            with closing(stream_calculator_tool(prompt, cache_key,
+                                                on_status=lambda label: status.update(label=label),
+                                                mode=mode,
+                                                fallback_input=tool_prompt)) as tokens:
+                st.write_stream(tokens)
+        except QueueFullError:
+            status.update(label="AI is busy", state="error")
+            st.warning("The AI planner is handling too many requests right now. Please try again in a minute, "
+                       "or use ⚡Suggest PTO Plan which runs instantly.")
+            return
+        except TimeoutError:
+            status.update(label="AI timed out", state="error")
+            st.warning("The AI planner took too long to answer. Please try again.")
+            return
+        status.update(label="Done", state="complete")
+        cache = get_response_cache()
+        st.caption(f"AI response cache: {cache.hits} hits / {cache.misses} misses")
+
+def check_ai_plan(text, monthly_workdays, planned_pto, pto_allowance):
+    return check_plan(parse_plan(text, list(monthly_workdays)), monthly_workdays,
+                      st.session_state.workdays_percentage, st.session_state.pto_accounting_policy,
+                      st.session_state.extended_christmas_break, pto_allowance, planned_pto,
+                      st.session_state.holiday_calendar)
+
+def show_ai_candidates(mode, prompt, tool_prompt, cache_key, monthly_workdays, planned_pto, pto_allowance):
+    """Write several AI drafts at once and show the best one that passes plan_check; the rest are discarded."""
+    status = st.status("Writing several drafts...")
+    cached = get_response_cache().get(cache_key)
+    if cached is not None:
+        candidates = [{'mode': mode, 'temperature': 0.0, 'seconds': 0.0, 'text': cached}]
+    else:
+        temperatures = CANDIDATE_TEMPERATURES[:max(AI_CANDIDATES, 1)]
+        runs = [(mode, prompt, temperature) for temperature in temperatures]
+        if mode == DIRECT_MODE and len(runs) > 1:
+            # One draft does its own arithmetic with the calculator tool, a different route to the same answer
+            runs[-1] = (TOOL_MODE, tool_prompt, temperatures[-1])
+        try:
+            candidates = generate_candidates(runs, AI_CANDIDATE_BUDGET_SECONDS,
+                                             on_status=lambda label: status.update(label=label))
+        except QueueFullError:
+            status.update(label="AI is busy", state="error")
+            st.warning("The AI planner is handling too many requests right now. Please try again in a minute, "
+                       "or use ⚡Suggest PTO Plan which runs instantly.")
+            return
+
+    with metrics.span('ai_plan_check'):
+        for candidate in candidates:
+            if 'text' in candidate:
+                candidate['check'] = check_ai_plan(candidate['text'], monthly_workdays, planned_pto, pto_allowance)
+            else:
+                candidate['check'] = {'valid': False, 'issues': [f"failed: {candidate['error']!r}"]}
+            metrics.incr('ai_candidates_total', result='valid' if candidate['check']['valid'] else 'invalid')
+    valid, invalid = rank_candidates(candidates)
+
+    if not valid:
+        status.update(label="No draft checked out", state="error")
+        st.warning("None of the AI drafts matched the calendar, the office-day formula and your PTO allowance. "
+                   "Please try again, or use ⚡Suggest PTO Plan which is always consistent.")
+    else:
+        best = valid[0]
+        if cached is None:
+            get_response_cache().set(cache_key, best['text'])
+        status.update(label="Done", state="complete")
+        st.markdown("**AI Suggested PTO Plan**:")
+        st.markdown(best['text'])
+        check = best['check']
+        st.caption(f"Checked: {check['total_pto']:g} PTO days and {check['total_office_days']:g} office days in "
+                   f"total, longest break {check['longest_break']} days. Best of {len(valid)} valid draft(s), "
+                   f"{len(invalid)} discarded.")
+        for warning in check['warnings']:
+            st.caption(f"Note: {warning}")
+    if invalid:
+        with st.expander(f"Discarded drafts ({len(invalid)})"):
+            for candidate in invalid:
+                st.markdown(f"- Temperature {candidate['temperature']:g} ({candidate['mode']}): "
+                            + "; ".join(candidate['check']['issues']))
+    cache = get_response_cache()
+    st.caption(f"AI response cache: {cache.hits} hits / {cache.misses} misses")
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    """Serve /metrics once per process when RTO_METRICS_PORT is set."""
+    return metrics.serve()
+
+def show_debug_panel():
+    """Timings, counters and recent AI requests of this process; opt-in with RTO_DEBUG_PANEL=1 or ?debug=1."""
+    if os.environ.get('RTO_DEBUG_PANEL') != '1' and st.query_params.get('debug') != '1':
+        return
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("Debug: timings and metrics"):
+        st.caption(f"This rerun: {(time.perf_counter() - rerun_start) * 1000:.1f} ms")
+        if snapshot['spans']:
+            st.dataframe(pd.DataFrame(snapshot['spans']).sort_values('span').round(3), hide_index=True)
+        if snapshot['counters'] or snapshot['gauges']:
+            st.dataframe(pd.DataFrame(snapshot['counters'] + snapshot['gauges']), hide_index=True)
+        if request_stats:
+            st.dataframe(pd.DataFrame(list(request_stats)[-10:]), hide_index=True)
+        st.download_button("Prometheus metrics", metrics.prometheus_text(), file_name="metrics.prom")
 
 def reset_global_var():
     st.session_state.monthly_data = None
     st.session_state.monthly_workdays = None
     st.session_state.total_pto = 0
 
-def required_office_days_formula(pto_accounting_policy):
-    if pto_accounting_policy == 'PTO subtracted from workdays':
-        formula = """
-        The formula of required office day is: [(Number of workday - PTO days) * 0.6]
-
-        For example, if there are 22 work days, and I take 10 PTO, then required office day is (22-10)*0.6 = 7.2 days
-        """
-    else:
-        formula = """
-        The formula of required office day is: [Number of workday * 0.6 - PTO days] \n
-        For example, if there are 22 work days, and I take 10 PTO, then required office day is 22*0.6 - 10  = 3.2 days
-        """
-    return formula
-
 def init_session_state():
     """Initialize session state variables."""
     if 'reset_specific_pto' not in st.session_state:
@@ -256,9 +405,13 @@ def init_session_state():
         st.session_state.ai_pto_factor = 'Yes, and plan additional PTOs'
     if 'ai_pto_days' not in st.session_state:
         st.session_state.ai_pto_days = 0
+    if 'ai_candidates' not in st.session_state:
+        st.session_state.ai_candidates = False
 
 
 #####START OF THE APP ########
+rerun_start = time.perf_counter()
+start_metrics_server()
 init_session_state() # Initialize session state variables
 
 st.title("Return to Office Calculator")
@@ -275,6 +428,9 @@ with st.sidebar:
             start_date = st.date_input("Start Date", datetime(datetime.today().year, 1, 1))
         with col2:
             end_date = st.date_input("End Date", datetime(datetime.today().year, 12, 31))
+        st.selectbox("Holiday calendar", list(available_calendars()), key="holiday_calendar",
+                     help="Public holidays of your office's region, or your company's own calendar")
+        holiday_calendar = st.session_state.holiday_calendar
         st.checkbox("Holiday between Christmas and New Year?", value=True,key="extended_christmas_break")
         extended_christmas_break = st.session_state.extended_christmas_break
     
@@ -306,7 +462,7 @@ with st.sidebar:
     with st.expander("PTO accounting policy", expanded = True):
         pto_accounting_policy = st.radio(
             'Choose how PTO is accounted for', 
-            ['PTO subtracted from workdays', 'PTO as a day in office'],
+            PTO_ACCOUNTING_POLICIES,
             horizontal=True,
             key='pto_accounting_policy', 
             help="""
@@ -347,13 +503,16 @@ with app_tab:
                                     step=0.5,
                                     help="Select average number of PTO days you plan to take per month")
             #Get number of holidays
-            holidays = get_custom_holidays(start_date, end_date, extended_christmas_break)['holiday_dates']
+            with metrics.span('holidays'):
+                holidays = load_holidays(start_date, end_date, extended_christmas_break, holiday_calendar)['holiday_dates']
 
             # Calculate workdays for the entire period
-            total_workdays = calculate_workdays(start_date, end_date)
+            with metrics.span('workdays'):
+                total_workdays = load_workdays(start_date, end_date, extended_christmas_break, holiday_calendar)
             
             # Calculate monthly breakdown
-            monthly_workdays = calculate_monthly_workdays(start_date, end_date)
+            with metrics.span('monthly_workdays'):
+                monthly_workdays = load_monthly_workdays(start_date, end_date, extended_christmas_break, holiday_calendar)
             
             # Calculate office days (60% of workdays minus PTO)
             months_count = len(monthly_workdays)
@@ -364,21 +523,9 @@ with app_tab:
 
         if total_pto <= total_pto_allowance:
             # Calculate monthly data
-            monthly_data = []
-            for month, workdays in monthly_workdays.items():
-                if st.session_state.pto_accounting_policy == 'PTO subtracted from workdays':
-                    net_days = workdays - monthly_pto_avg
-                    office_days = math.floor(net_days * ( rto_policy * 0.01))
-                else:
-                    net_days = workdays
-                    office_days = math.floor(net_days * (rto_policy * 0.01)) - monthly_pto_avg
-                monthly_data.append({
-                    'Month': pd.to_datetime(month + "-01").strftime("%b %Y"),
-                    'Work Days': workdays,
-                    'PTO Days': monthly_pto,
-                    'Net Work Days': net_days,
-                    'Office Days Required': office_days
-                })
+            with metrics.span('monthly_data'):
+                monthly_data = build_monthly_data(monthly_workdays, monthly_pto_avg, rto_policy,
+                                                  st.session_state.pto_accounting_policy)
             display_metrics_and_charts(monthly_data, monthly_workdays, holidays)
         else:
             st.error("Total PTO exceeds allowance!")
@@ -389,9 +536,11 @@ with app_tab:
         reset_global_var()
         if start_date and end_date and start_date <= end_date:
             #Get number of holidays
-            holidays = get_custom_holidays(start_date, end_date, extended_christmas_break)['holiday_dates']
+            with metrics.span('holidays'):
+                holidays = load_holidays(start_date, end_date, extended_christmas_break, holiday_calendar)['holiday_dates']
             # Calculate monthly workdays
-            monthly_workdays = calculate_monthly_workdays(start_date, end_date)
+            with metrics.span('monthly_workdays'):
+                monthly_workdays = load_monthly_workdays(start_date, end_date, extended_christmas_break, holiday_calendar)
             # Create columns for PTO inputs
             with st.container(border = True):
                 st.write('Enter PTO days for each month')
@@ -424,21 +573,9 @@ with app_tab:
             
             if total_pto <= total_pto_allowance:
                 # Calculate monthly data
-                monthly_data = []
-                for month, workdays in monthly_workdays.items():
-                    if st.session_state.pto_accounting_policy == 'PTO subtracted from workdays':
-                        net_days = workdays - monthly_pto[month]
-                        office_days = round(net_days * 0.6, 0)
-                    else:
-                        net_days = workdays
-                        office_days = round(net_days * 0.6, 0) - monthly_pto[month]
-                    monthly_data.append({
-                        'Month': pd.to_datetime(month + "-01").strftime("%b %Y"),
-                        'Work Days': workdays,
-                        'PTO Days': monthly_pto[month],
-                        'Net Work Days': net_days,
-                        'Office Days Required': office_days
-                    })
+                with metrics.span('monthly_data'):
+                    monthly_data = build_monthly_data(monthly_workdays, monthly_pto, rto_policy,
+                                                      st.session_state.pto_accounting_policy)
                 display_metrics_and_charts(monthly_data, monthly_workdays, holidays)
             else:
                 st.error("Total PTO exceeds allowance!")
@@ -446,6 +583,10 @@ with app_tab:
 
 with holiday_tab:
     st.subheader("Company Holidays")
-    holidays_df = get_custom_holidays(start_date, end_date, extended_christmas_break)['holiday_df']
+    holidays_df = load_holidays(start_date, end_date, extended_christmas_break, holiday_calendar)['holiday_df']
     holidays_df['Date'] = holidays_df['Date'].dt.strftime('%b %d, %Y')
-    st.dataframe(holidays_df, hide_index=True, use_container_width=True)
\ No newline at end of file
+    st.dataframe(holidays_df, hide_index=True, use_container_width=True)
+
+metrics.observe('rerun', time.perf_counter() - rerun_start)
+metrics.export()
+show_debug_panel()
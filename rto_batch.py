@@ -0,0 +1,187 @@
+"""Headless batch mode: compute RTO plans for many employees from a CSV or Parquet file.
+
+Input has one row per employee with the columns
+
+    employee_id, start_date, end_date,
+    rto_percentage            (default 60)
+    pto_accounting_policy     (default 'PTO subtracted from workdays')
+    extended_christmas_break  (default True)
+    holiday_calendar          (default 'US (company)', see calendars.py)
+    avg_pto                   (optional, PTO days per month)
+    pto_YYYY-MM               (optional, PTO days for that month, overrides avg_pto)
+
+and the output has one row per employee per month with the same columns as the
+app's "Detailed Monthly Table".
+
+Usage:
+    python rto_batch.py employees.csv plans.csv --workers 4 --chunksize 5000
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calendars import DEFAULT_CALENDAR
+from rto_core import PTO_ACCOUNTING_POLICIES, PTO_SUBTRACTED, calculate_monthly_workdays, calculate_office_days
+
+DEFAULT_RTO_PERCENTAGE = 60.0
+OUTPUT_COLUMNS = ['employee_id', 'Month', 'Work Days', 'PTO Days', 'Net Work Days', 'Office Days Required']
+
+
+def normalize_employees(df):
+    """Fill defaults and coerce the input columns to the types plan_chunk expects."""
+    df = df.copy()
+    df['start_date'] = pd.to_datetime(df['start_date']).dt.normalize()
+    df['end_date'] = pd.to_datetime(df['end_date']).dt.normalize()
+    if 'rto_percentage' not in df:
+        df['rto_percentage'] = DEFAULT_RTO_PERCENTAGE
+    df['rto_percentage'] = df['rto_percentage'].fillna(DEFAULT_RTO_PERCENTAGE).astype(float)
+    if 'pto_accounting_policy' not in df:
+        df['pto_accounting_policy'] = PTO_SUBTRACTED
+    df['pto_accounting_policy'] = df['pto_accounting_policy'].fillna(PTO_SUBTRACTED).astype(str).str.strip()
+    unknown = ~df['pto_accounting_policy'].isin(PTO_ACCOUNTING_POLICIES)
+    if unknown.any():
+        bad = df[unknown].head(5)
+        rows = [f"employee_id {row}" for row in bad['employee_id']] if 'employee_id' in df else \
+            [f"row {row}" for row in bad.index]
+        raise ValueError(f"unknown pto_accounting_policy {bad['pto_accounting_policy'].iloc[0]!r} for "
+                         f"{', '.join(rows)}{' ...' if unknown.sum() > 5 else ''}; "
+                         f"expected one of {PTO_ACCOUNTING_POLICIES}")
+    if 'extended_christmas_break' not in df:
+        df['extended_christmas_break'] = True
+    # A 1/0 column with blanks is read as floats (1.0, NaN), so numbers are compared to 0 rather than as text
+    flags = df['extended_christmas_break'].fillna(True)
+    numeric = pd.to_numeric(flags, errors='coerce')
+    df['extended_christmas_break'] = numeric.ne(0).where(
+        numeric.notna(), flags.astype(str).str.strip().str.lower().isin(['true', 'yes', 'y'])).astype(bool)
+    if 'holiday_calendar' not in df:
+        df['holiday_calendar'] = DEFAULT_CALENDAR
+    df['holiday_calendar'] = df['holiday_calendar'].fillna(DEFAULT_CALENDAR)
+    if 'avg_pto' not in df:
+        df['avg_pto'] = 0.0
+    df['avg_pto'] = df['avg_pto'].fillna(0.0).astype(float)
+    return df
+
+
+def monthly_pto_matrix(df, months):
+    """Employees x months PTO days; pto_YYYY-MM columns override the avg_pto average."""
+    pto = np.repeat(df['avg_pto'].to_numpy(dtype=float)[:, None], len(months), axis=1)
+    for j, month in enumerate(months):
+        column = f'pto_{month}'
+        if column in df:
+            month_pto = df[column].to_numpy(dtype=float)
+            pto[:, j] = np.where(np.isnan(month_pto), pto[:, j], month_pto)
+    return pto
+
+
+def plan_chunk(df):
+    """Compute the per-month table for a chunk of employees.
+
+    Employees that share a calendar (date range, Christmas flag, holiday calendar) and policy are
+    computed together as one employees x months array.
+    """
+    df = normalize_employees(df)
+    group_keys = ['start_date', 'end_date', 'extended_christmas_break', 'holiday_calendar', 'pto_accounting_policy']
+    results = []
+    for (start, end, christmas_break, calendar, policy), group in df.groupby(group_keys, sort=False):
+        monthly_workdays = calculate_monthly_workdays(start, end, christmas_break, calendar)
+        if not monthly_workdays:
+            continue
+        months = list(monthly_workdays)
+        workdays = np.array(list(monthly_workdays.values()), dtype=float)
+
+        pto = monthly_pto_matrix(group, months)
+        rto_percentage = group['rto_percentage'].to_numpy()[:, None]
+        net_days, office_days = calculate_office_days(workdays[None, :], pto, rto_percentage, policy)
+
+        n_employees = len(group)
+        results.append(pd.DataFrame({
+            'employee_id': np.repeat(group['employee_id'].to_numpy(), len(months)),
+            'Month': np.tile(pd.to_datetime(months, format='%Y-%m').strftime('%b %Y'), n_employees),
+            'Work Days': np.tile(workdays, n_employees),
+            'PTO Days': pto.ravel(),
+            'Net Work Days': net_days.ravel(),
+            'Office Days Required': office_days.ravel(),
+        }))
+    if not results:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    return pd.concat(results, ignore_index=True)
+
+
+def iter_chunks(path, chunksize):
+    """Stream the input file in chunks of roughly `chunksize` rows."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+class ResultWriter:
+    """Append result chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_writer = None
+        self.rows = 0
+
+    def write(self, df):
+        if self.path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def run_batch(input_path, output_path, workers=None, chunksize=5000):
+    """Plan every employee in `input_path` and write the monthly rows to `output_path`.
+
+    Chunks are processed on a process pool with a bounded number in flight, and
+    written in input order, so memory stays flat regardless of the input size.
+    Returns the number of rows written.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(output_path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in iter_chunks(input_path, chunksize):
+                pending.append(pool.submit(plan_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute RTO office-day plans for many employees.")
+    parser.add_argument('input', help="CSV or .parquet file with one row per employee")
+    parser.add_argument('output', help="CSV or .parquet file for the per-month results")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=5000, help="Employees per chunk")
+    args = parser.parse_args(argv)
+
+    rows = run_batch(args.input, args.output, workers=args.workers, chunksize=args.chunksize)
+    print(f"Wrote {rows} rows to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import copy
+import numpy as np
+import pandas as pd
+from calendar import month_abbr
+from functools import lru_cache
+
+from calendars import DEFAULT_CALENDAR, load_year
+
+PTO_SUBTRACTED = 'PTO subtracted from workdays'
+PTO_AS_OFFICE_DAY = 'PTO as a day in office'
+PTO_ACCOUNTING_POLICIES = [PTO_SUBTRACTED, PTO_AS_OFFICE_DAY]
+
+@lru_cache(maxsize=64)
+def get_year_holidays(year, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+    """Build the company holiday calendar for a single year, cached per (year, break flag, calendar)."""
+    # Precompiled holidays of the selected calendar (see calendars.py)
+    dates, names = load_year(calendar, year)
+    holiday_names = dict(zip(pd.DatetimeIndex(dates.astype('datetime64[us]')), names.tolist()))
+
+    # Add Christmas Break (Dec 24–Dec 31, skipping weekends)
+    if extended_christmas_break:
+        christmas_break = pd.date_range(start=f"{year}-12-24", end=f"{year}-12-31")
+        christmas_break = christmas_break[~christmas_break.weekday.isin([5, 6])]
+        # setdefault keeps Christmas Day (and any observed holiday) under its own name
+        for date in christmas_break:
+            holiday_names.setdefault(date, "Christmas Break")
+
+    holiday_df = pd.DataFrame(list(holiday_names.items()), columns=["Date", "Holiday Name"])
+    holiday_df["Date"] = pd.to_datetime(holiday_df["Date"])
+    return holiday_df.sort_values("Date").reset_index(drop=True)
+
+def get_custom_holidays(start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+    start = pd.to_datetime(start_date)
+    end = pd.to_datetime(end_date)
+
+    # Stitch together the cached years covering the range, then slice to it
+    holiday_df = pd.concat(
+        [get_year_holidays(year, extended_christmas_break, calendar) for year in range(start.year, end.year + 1)],
+        ignore_index=True,
+    )
+    holiday_df_sorted = holiday_df[holiday_df["Date"].between(start, end)].reset_index(drop=True)
+
+    holiday_result_dict = {
+        'holiday_df': holiday_df_sorted,
+        'holiday_dates': holiday_df_sorted["Date"]
+    }
+    return holiday_result_dict
+
+# Day flags used by DayCalendar
+WEEKEND = 1
+HOLIDAY = 2
+PTO = 4
+COMPANY_BREAK = 8
+NON_WORKDAY = WEEKEND | HOLIDAY | COMPANY_BREAK
+
+class DayCalendar:
+    """Per-day calendar of a date range with prefix sums for O(1) range queries.
+
+    `flags` holds one uint8 bitmask per day (WEEKEND, HOLIDAY, PTO, COMPANY_BREAK).
+    Workdays and PTO days of any inclusive sub-range come from two cumulative-sum
+    lookups, and every query method accepts arrays of bounds as well as scalars.
+    """
+
+    def __init__(self, start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+        self.start = pd.Timestamp(start_date).normalize()
+        self.end = pd.Timestamp(end_date).normalize()
+        self.days = pd.date_range(self.start, self.end)
+
+        flags = np.zeros(len(self.days), dtype=np.uint8)
+        flags[self.days.weekday >= 5] |= WEEKEND
+        holiday_df = get_custom_holidays(self.start, self.end, extended_christmas_break, calendar)['holiday_df']
+        holiday_index = self._index(holiday_df['Date'])
+        is_break = (holiday_df['Holiday Name'] == "Christmas Break").to_numpy()
+        flags[holiday_index[~is_break]] |= HOLIDAY
+        flags[holiday_index[is_break]] |= COMPANY_BREAK
+        self.flags = flags
+
+        self.is_workday = (flags & NON_WORKDAY) == 0
+        self._workday_sums = np.concatenate([[0], np.cumsum(self.is_workday, dtype=np.int32)])
+        self.pto = np.zeros(len(self.days))
+        self._pto_sums = np.zeros(len(self.days) + 1)
+
+    def _index(self, dates):
+        """Day offsets of `dates` from the start of the calendar."""
+        return np.asarray((pd.DatetimeIndex(np.atleast_1d(dates)) - self.start).days)
+
+    def _bounds(self, start_date, end_date):
+        scalar = np.ndim(start_date) == 0
+        start = np.clip(self._index(start_date), 0, len(self.days))
+        end = np.clip(self._index(end_date) + 1, 0, len(self.days))
+        return start, np.maximum(end, start), scalar
+
+    def with_pto(self, pto_dates=(), monthly_pto=None):
+        """Copy of the calendar with PTO marked.
+
+        `pto_dates` are whole PTO days. `monthly_pto` maps 'YYYY-MM' to PTO days that
+        aren't tied to dates; they are spread evenly over that month's workdays.
+        """
+        calendar = copy.copy(self)
+        calendar.flags = self.flags.copy()
+        calendar.pto = np.zeros(len(self.days))
+        if monthly_pto:
+            # Month number of each day, counted from the calendar's first month
+            month_ids = (self.days.year - self.start.year) * 12 + self.days.month - self.start.month
+            periods = pd.PeriodIndex(list(monthly_pto), freq='M')
+            pto_ids = (periods.year - self.start.year) * 12 + periods.month - self.start.month
+            n_months = month_ids[-1] + 1
+            in_range = (pto_ids >= 0) & (pto_ids < n_months)
+            month_pto = np.zeros(n_months)
+            month_pto[pto_ids[in_range]] = np.asarray(list(monthly_pto.values()), dtype=float)[in_range]
+            month_workdays = np.bincount(month_ids, weights=self.is_workday, minlength=n_months)
+            per_day = np.divide(month_pto, month_workdays, out=np.zeros(n_months), where=month_workdays > 0)
+            calendar.pto = per_day[month_ids] * self.is_workday
+        if len(pto_dates):
+            pto_index = self._index(pto_dates)
+            pto_index = pto_index[(pto_index >= 0) & (pto_index < len(self.days))]
+            calendar.pto[pto_index[self.is_workday[pto_index]]] = 1.0
+        calendar.flags[calendar.pto > 0] |= PTO
+        calendar._pto_sums = np.concatenate([[0], np.cumsum(calendar.pto)])
+        return calendar
+
+    def workdays(self, start_date, end_date):
+        start, end, scalar = self._bounds(start_date, end_date)
+        counts = self._workday_sums[end] - self._workday_sums[start]
+        return int(counts[0]) if scalar else counts
+
+    def pto_days(self, start_date, end_date):
+        start, end, scalar = self._bounds(start_date, end_date)
+        # Rounding drops the float error that spread-out monthly PTO leaves in the sums
+        totals = np.round(self._pto_sums[end] - self._pto_sums[start], 6)
+        return float(totals[0]) if scalar else totals
+
+    def summarize(self, start_dates, end_dates, rto_percentage, pto_accounting_policy):
+        """Work, PTO, net and required office days for each (start, end) range, as a DataFrame."""
+        workdays = self.workdays(start_dates, end_dates)
+        pto_days = self.pto_days(start_dates, end_dates)
+        net_days, office_days = calculate_office_days(workdays, pto_days, rto_percentage, pto_accounting_policy)
+        return pd.DataFrame({
+            'Start': pd.DatetimeIndex(start_dates),
+            'End': pd.DatetimeIndex(end_dates),
+            'Work Days': workdays,
+            'PTO Days': pto_days,
+            'Net Work Days': net_days,
+            'Office Days Required': office_days,
+        })
+
+    def periods(self, freq):
+        """(labels, starts, ends) of the calendar months ('M'), quarters ('Q') or ISO weeks ('W')."""
+        periods = pd.period_range(self.start, self.end, freq='W-SUN' if freq == 'W' else freq)
+        starts = periods.start_time.normalize()
+        starts = starts.where(starts >= self.start, self.start)
+        ends = periods.end_time.normalize()
+        ends = ends.where(ends <= self.end, self.end)
+        if freq == 'W':
+            iso = periods.start_time.isocalendar()
+            labels = [f"{year}-W{week:02d}" for year, week in zip(iso.year, iso.week)]
+        elif freq == 'Q':
+            labels = [f"Q{period.quarter} {period.year}" for period in periods]
+        else:
+            labels = list(periods.strftime('%b %Y'))
+        return labels, starts, ends
+
+    def rolling_windows(self, weeks=12):
+        """(starts, ends) of every window of `weeks` full ISO weeks inside the calendar."""
+        first_monday = self.start + pd.Timedelta(days=(7 - self.start.weekday()) % 7)
+        starts = pd.date_range(first_monday, self.end - pd.Timedelta(weeks=weeks) + pd.Timedelta(days=1), freq='7D')
+        return starts, starts + pd.Timedelta(weeks=weeks) - pd.Timedelta(days=1)
+
+@lru_cache(maxsize=32)
+def get_day_calendar(start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+    """Cached DayCalendar for a date range (without PTO; use with_pto for a plan)."""
+    return DayCalendar(start_date, end_date, extended_christmas_break, calendar)
+
+def period_table(calendar, freq, rto_percentage, pto_accounting_policy):
+    """Per-period (month 'M', quarter 'Q', ISO week 'W') or rolling 12-week ('12W') table."""
+    if freq == '12W':
+        starts, ends = calendar.rolling_windows(weeks=12)
+        labels = [f"{start:%b %d, %Y} – {end:%b %d, %Y}" for start, end in zip(starts, ends)]
+    else:
+        labels, starts, ends = calendar.periods(freq)
+    table = calendar.summarize(starts, ends, rto_percentage, pto_accounting_policy)
+    table.insert(0, 'Period', labels)
+    return table.drop(columns=['Start', 'End'])
+
+def calculate_workdays(start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+    """Calculate number of workdays between two dates, excluding company holidays."""
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    return get_day_calendar(start, end, extended_christmas_break, calendar).workdays(start, end)
+
+def calculate_monthly_workdays(start_date, end_date, extended_christmas_break, calendar=DEFAULT_CALENDAR):
+    """Calculate workdays for each month in the date range."""
+    months = pd.date_range(start=start_date, end=end_date, freq='ME')
+    if months.empty:
+        return {}
+
+    month_starts = months.to_period('M').to_timestamp()
+    day_calendar = get_day_calendar(month_starts[0], months[-1], extended_christmas_break, calendar)
+    workdays = day_calendar.workdays(month_starts, months)
+    return dict(zip(months.strftime('%Y-%m'), workdays.tolist()))
+
+def calculate_office_days(workdays, pto_days, rto_percentage, pto_accounting_policy):
+    """Return (net workdays, required office days) for the given PTO accounting policy.
+
+    Works element-wise, so any argument except the policy may be a numpy array.
+    """
+    if pto_accounting_policy == PTO_SUBTRACTED:
+        net_days = workdays - pto_days
+        office_days = np.floor(net_days * (rto_percentage * 0.01))
+    else:
+        net_days = workdays + np.zeros_like(pto_days)
+        office_days = np.floor(net_days * (rto_percentage * 0.01)) - pto_days
+    return net_days, office_days
+
+@lru_cache(maxsize=4096)
+def _monthly_row(month, workdays, pto_days, rto_percentage, pto_accounting_policy):
+    """(label, net workdays, office days) of one month, cached so unchanged months aren't recomputed."""
+    net_days, office_days = calculate_office_days(workdays, pto_days, rto_percentage, pto_accounting_policy)
+    label = f"{month_abbr[int(month[5:7])]} {month[:4]}"
+    return label, float(net_days), float(office_days)
+
+def build_monthly_data(monthly_workdays, monthly_pto, rto_percentage, pto_accounting_policy):
+    """Build the per-month table shown in the app.
+
+    `monthly_pto` is either one value applied to every month or a dict keyed like `monthly_workdays`.
+    Rows are memoized per (month, workdays, PTO, RTO %, policy), so after a one-month PTO edit
+    only that month is recalculated.
+    """
+    monthly_data = []
+    for month, workdays in monthly_workdays.items():
+        pto_days = monthly_pto[month] if isinstance(monthly_pto, dict) else monthly_pto
+        label, net_days, office_days = _monthly_row(month, workdays, pto_days, rto_percentage, pto_accounting_policy)
+        monthly_data.append({
+            'Month': label,
+            'Work Days': workdays,
+            'PTO Days': pto_days,
+            'Net Work Days': net_days,
+            'Office Days Required': office_days
+        })
+    return monthly_data
+
+def scenario_sweep(monthly_workdays, rto_percentages, avg_pto_values, policies=PTO_ACCOUNTING_POLICIES):
+    """Total and average monthly office days for every (policy, RTO %, average monthly PTO) combination.
+
+    The grid is evaluated as one broadcast array per policy over the monthly workday counts.
+    """
+    workdays = np.array(list(monthly_workdays.values()), dtype=float)
+    rto = np.asarray(rto_percentages, dtype=float)
+    pto = np.asarray(avg_pto_values, dtype=float)
+    months = max(len(workdays), 1)
+    tables = []
+    for policy in policies:
+        _, office_days = calculate_office_days(workdays[None, None, :], pto[None, :, None], rto[:, None, None], policy)
+        total = office_days.sum(axis=-1)
+        tables.append(pd.DataFrame({
+            'Policy': policy,
+            'RTO %': np.repeat(rto, len(pto)),
+            'Avg PTO per Month': np.tile(pto, len(rto)),
+            'Total PTO': np.tile(pto, len(rto)) * len(workdays),
+            'Total Office Days': total.ravel(),
+            'Avg Monthly Office Days': total.ravel() / months,
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+def office_day_lookup(monthly_workdays, rto_percentage, pto_accounting_policy, planned_pto=None, max_extra_pto=5):
+    """Required office days per month for 0..max_extra_pto PTO days on top of `planned_pto`.
+
+    Lets a caller (e.g. the AI prompt) read off the effect of moving PTO between
+    months without doing any arithmetic.
+    """
+    planned_pto = planned_pto or {}
+    workdays = np.array(list(monthly_workdays.values()), dtype=float)
+    planned = np.array([planned_pto.get(month, 0.0) for month in monthly_workdays], dtype=float)
+    extra = np.arange(max_extra_pto + 1)
+    _, office_days = calculate_office_days(workdays[:, None], planned[:, None] + extra[None, :],
+                                           rto_percentage, pto_accounting_policy)
+    lookup = pd.DataFrame(office_days, columns=[f'Office Days with +{k} PTO' for k in extra])
+    lookup.insert(0, 'Month', pd.to_datetime(list(monthly_workdays), format='%Y-%m').strftime('%b %Y'))
+    lookup.insert(1, 'Work Days', workdays.astype(int))
+    lookup.insert(2, 'Planned PTO', planned)
+    return lookup
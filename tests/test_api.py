@@ -0,0 +1,121 @@
+"""Handler tests for rto_api: input validation, bulk scenarios and request coalescing."""
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import rto_api
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = rto_api.make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, path, body):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=30)
+    payload = body if isinstance(body, str) else json.dumps(body)
+    connection.request('POST', path, payload, {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    status, data = response.status, json.loads(response.read())
+    connection.close()
+    return status, data
+
+
+YEAR = {'start_date': '2025-01-01', 'end_date': '2025-12-31'}
+
+
+def test_office_days(server):
+    status, data = post(server, '/office-days', {**YEAR, 'avg_pto': 1, 'monthly_pto': {'2025-02': 3}})
+    assert status == 200
+    assert len(data['months']) == 12
+    february = data['months'][1]
+    assert february['PTO Days'] == 3
+    assert february['Office Days Required'] == (february['Work Days'] - 3) * 60 // 100
+    assert data['total_office_days'] == sum(row['Office Days Required'] for row in data['months'])
+
+
+def test_empty_scenarios(server):
+    assert post(server, '/scenarios', {'scenarios': []}) == (200, {'results': []})
+
+
+def test_scenarios_keep_input_order_and_ids(server):
+    scenarios = [{**YEAR, 'employee_id': 'b', 'rto_percentage': 40},
+                 {'start_date': '2025-01-01', 'end_date': '2025-03-31'}]
+    status, data = post(server, '/scenarios', {'scenarios': scenarios})
+    assert status == 200
+    assert [result['employee_id'] for result in data['results']] == ['b', 1]
+    assert [len(result['months']) for result in data['results']] == [12, 3]
+
+
+@pytest.mark.parametrize('path,body', [
+    ('/office-days', {**YEAR, 'holiday_calendar': ['x']}),
+    ('/office-days', {**YEAR, 'holiday_calendar': 'Atlantis'}),
+    ('/office-days', '{"start_date": "2025-01-01", "end_date": "2025-12-31", "rto_percentage": NaN}'),
+    ('/office-days', '{"start_date": "2025-01-01", "end_date": "2025-12-31", "avg_pto": Infinity}'),
+    ('/office-days', {**YEAR, 'rto_percentage': 120}),
+    ('/office-days', {**YEAR, 'pto_accounting_policy': 'PTO subtracted'}),
+    ('/office-days', {**YEAR, 'monthly_pto': {'Feb': 1}}),
+    ('/holidays', {'start_date': 20250101, 'end_date': '2025-12-31'}),
+    ('/holidays', {'start_date': '2025-12-31', 'end_date': '2025-01-01'}),
+    ('/holidays', {'start_date': '1900-01-01', 'end_date': '2025-01-01'}),
+    ('/holidays', {'end_date': '2025-01-01'}),
+    ('/holidays', [YEAR]),
+    ('/holidays', 'not json'),
+    ('/scenarios', {'scenarios': [{**YEAR, 'avg_pto': -1}]}),
+])
+def test_bad_input_is_a_400(server, path, body):
+    status, data = post(server, path, body)
+    assert status == 400
+    assert data['error']
+
+
+def test_unknown_endpoint(server):
+    assert post(server, '/nope', {})[0] == 404
+
+
+def test_equivalent_requests_share_a_cache_entry():
+    first = rto_api.handle('/monthly-workdays', {'start_date': '2025-01-01', 'end_date': '2025-06-30'})
+    entries = len(rto_api.response_cache._entries)
+    second = rto_api.handle('/monthly-workdays', {'start_date': '2025-01-01T00:00:00', 'end_date': '2025-06-30',
+                                                  'extended_christmas_break': True})
+    assert second is first
+    assert len(rto_api.response_cache._entries) == entries
+
+
+def test_coalescer_merges_concurrent_calls():
+    batches = []
+
+    def compute(key, items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    coalescer = rto_api.Coalescer(compute, window_seconds=0.2)
+    results = {}
+
+    def call(i):
+        results[i] = coalescer('key', i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    assert len(batches) == 1 and sorted(batches[0]) == list(range(8))
+    assert results == {i: i * 2 for i in range(8)}
+
+
+def test_coalescer_passes_errors_to_every_caller():
+    def compute(key, items):
+        raise ValueError("boom")
+
+    coalescer = rto_api.Coalescer(compute, window_seconds=0)
+    with pytest.raises(ValueError):
+        coalescer('key', 1)
@@ -0,0 +1,63 @@
+"""Input handling and per-month results in rto_batch."""
+import io
+
+import pandas as pd
+import pytest
+
+from rto_batch import normalize_employees, plan_chunk
+from rto_core import PTO_AS_OFFICE_DAY, PTO_SUBTRACTED, build_monthly_data, calculate_monthly_workdays
+
+
+def employees(policies):
+    return pd.DataFrame({'employee_id': ['a', 'b', 'c'][:len(policies)], 'start_date': '2025-01-01',
+                         'end_date': '2025-03-31', 'pto_accounting_policy': policies})
+
+
+def test_normalize_employees_fills_and_strips_policy():
+    df = normalize_employees(employees([None, f' {PTO_AS_OFFICE_DAY} ']))
+    assert df['pto_accounting_policy'].tolist() == [PTO_SUBTRACTED, PTO_AS_OFFICE_DAY]
+
+
+def test_normalize_employees_rejects_unknown_policy():
+    with pytest.raises(ValueError, match=r"'PTO ignored' for employee_id b"):
+        normalize_employees(employees([PTO_SUBTRACTED, 'PTO ignored', None]))
+
+
+def test_normalize_employees_names_the_row_without_employee_id():
+    with pytest.raises(ValueError, match=r"for row 1;"):
+        normalize_employees(employees([PTO_SUBTRACTED, 'PTO ignored']).drop(columns='employee_id'))
+
+
+@pytest.mark.parametrize('column, expected', [
+    ('1,,0', [True, True, False]),
+    ('1.0,0.0,', [True, False, True]),
+    ('true,No,y', [True, False, True]),
+])
+def test_normalize_employees_reads_christmas_flags(column, expected):
+    rows = '\n'.join(f"{i},2025-01-01,2025-03-31,{value}" for i, value in enumerate(column.split(',')))
+    df = pd.read_csv(io.StringIO("employee_id,start_date,end_date,extended_christmas_break\n" + rows))
+    assert normalize_employees(df)['extended_christmas_break'].tolist() == expected
+
+
+def test_plan_chunk_matches_build_monthly_data():
+    df = pd.DataFrame({
+        'employee_id': [1, 2, 3, 4],
+        'start_date': ['2025-01-01', '2025-01-01', '2024-11-15', '2025-01-01'],
+        'end_date': ['2025-06-30', '2025-06-30', '2025-02-28', '2025-06-30'],
+        'rto_percentage': [60, 40, 100, None],
+        'pto_accounting_policy': [PTO_SUBTRACTED, PTO_AS_OFFICE_DAY, PTO_SUBTRACTED, None],
+        'extended_christmas_break': [True, True, False, True],
+        'avg_pto': [1.0, 0.5, None, 2.0],
+        'pto_2025-02': [3.0, None, 0.0, None],
+    })
+    result = plan_chunk(df)
+    for _, row in normalize_employees(df).iterrows():
+        monthly_workdays = calculate_monthly_workdays(row['start_date'], row['end_date'],
+                                                      row['extended_christmas_break'])
+        monthly_pto = {month: row['avg_pto'] for month in monthly_workdays}
+        if '2025-02' in monthly_pto and pd.notna(row['pto_2025-02']):
+            monthly_pto['2025-02'] = row['pto_2025-02']
+        expected = pd.DataFrame(build_monthly_data(monthly_workdays, monthly_pto, row['rto_percentage'],
+                                                   row['pto_accounting_policy']))
+        actual = result[result['employee_id'] == row['employee_id']].drop(columns='employee_id')
+        pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected, check_dtype=False)
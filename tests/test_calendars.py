@@ -0,0 +1,60 @@
+"""Company calendar file parsers in calendars."""
+from datetime import date
+
+from calendars import read_csv, read_ics
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_read_csv(tmp_path):
+    path = write(tmp_path, 'company.csv', "\ufeffDate,Holiday Name\n2025-01-02,Winter Shutdown \n"
+                                          "2025-07-03T00:00:00, Summer Friday\n,\n")
+    assert read_csv(path) == {date(2025, 1, 2): "Winter Shutdown", date(2025, 7, 3): "Summer Friday"}
+
+
+def test_read_csv_flexible_columns(tmp_path):
+    assert read_csv(write(tmp_path, 'a.csv', "day,name\n2025-03-17,St Patrick's Day\n")) == \
+        {date(2025, 3, 17): "St Patrick's Day"}
+    assert read_csv(write(tmp_path, 'b.csv', "Date\n2025-03-17\n")) == {date(2025, 3, 17): "Holiday"}
+    assert read_csv(write(tmp_path, 'c.csv', "")) == {}
+
+
+ICS = """BEGIN:VCALENDAR\r
+BEGIN:VEVENT\r
+DTSTART;VALUE=DATE:20251226\r
+DTEND;VALUE=DATE:20251230\r
+SUMMARY:Winter\\, shutdown\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+DTSTART;VALUE=DATE:20240704\r
+RRULE:FREQ=YEARLY\r
+SUMMARY:Independence\r
+  Day\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+DTSTART;VALUE=DATE:20250101\r
+RRULE:FREQ=YEARLY;BYMONTH=1\r
+SUMMARY:First only\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+SUMMARY:No start\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+def test_read_ics(tmp_path):
+    holidays = read_ics(write(tmp_path, 'company.ics', ICS), recurring_years=range(2020, 2027))
+    # DTEND is exclusive
+    assert [day for day, name in holidays.items() if name == "Winter, shutdown"] == \
+        [date(2025, 12, 26), date(2025, 12, 27), date(2025, 12, 28), date(2025, 12, 29)]
+    # Yearly repeats start at the first year; continuation lines are unfolded
+    assert [day for day, name in holidays.items() if name == "Independence Day"] == \
+        [date(year, 7, 4) for year in range(2024, 2027)]
+    # Rules with BY* parts aren't expanded
+    assert [day for day, name in holidays.items() if name == "First only"] == [date(2025, 1, 1)]
+    assert "No start" not in holidays.values()
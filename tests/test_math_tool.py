@@ -0,0 +1,41 @@
+"""The batched numexpr calculator the AI calls in math_tool."""
+import json
+
+import pytest
+
+pytest.importorskip('streamlit')
+
+from math_tool import _compile, calculator  # noqa: E402
+
+
+def calculate(expressions):
+    return json.loads(calculator(expressions))
+
+
+def test_batch_of_expressions():
+    assert calculate({"jan": "(22 - 1) * 0.6", "feb": "(20-0)*0.6", "root": "32**(1/5)", "circle": "2 * pi"}) == \
+        {"jan": 12.6, "feb": 12, "root": 2, "circle": 6.283185}
+
+
+def test_expressions_sharing_a_template_are_compiled_once():
+    _compile.cache_clear()
+    results = calculate({f"m{i}": f"({20 + i} - {i % 3}) * 0.6" for i in range(12)})
+    assert results == {f"m{i}": round((20 + i - i % 3) * 0.6, 6) for i in range(12)}
+    assert _compile.cache_info().misses == 1
+
+
+def test_results_keep_the_request_order():
+    expressions = {"b": "1 + 1", "a": "2 * 3", "c": "1 + 2", "d": "x + 1"}
+    assert list(calculate(expressions)) == ["b", "a", "c", "d"]
+
+
+def test_errors_are_reported_per_expression():
+    results = calculate({"ok": "1 + 1", "bad": "1 +", "also_ok": "2 + 2"})
+    assert results["ok"] == 2
+    assert results["bad"].startswith("error:")
+    assert results["also_ok"] == 4
+
+
+@pytest.mark.parametrize('expression', ["x + 1", "_c0 + 1", "_c12 * 2"])
+def test_unknown_names_are_rejected(expression):
+    assert calculate({"a": expression})["a"].startswith("error: unknown name(s)")
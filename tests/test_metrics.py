@@ -0,0 +1,25 @@
+"""Prometheus export in metrics."""
+import threading
+
+import metrics
+
+
+def test_concurrent_exports(tmp_path):
+    path = tmp_path / 'metrics.prom'
+    errors = []
+
+    def export():
+        try:
+            for _ in range(100):
+                metrics.export(str(path))
+        except OSError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=export) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert path.read_text() == metrics.prometheus_text()
+    assert [p.name for p in tmp_path.iterdir()] == ['metrics.prom']
@@ -0,0 +1,49 @@
+"""Placement of office days and the headcount forecast in occupancy."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from occupancy import OccupancyCalendar, capacity_report, forecast_headcount, parse_weekdays
+from rto_batch import normalize_employees
+
+
+def employees(n, **columns):
+    return pd.DataFrame({'employee_id': range(n), 'start_date': '2025-01-01', 'end_date': '2025-12-31',
+                         'rto_percentage': 60.0, **columns})
+
+
+def test_uniform_population_gives_flat_headcount():
+    headcount = forecast_headcount(employees(2000))['default']
+    workdays = headcount[headcount > 0]
+    by_month = workdays.groupby(workdays.index.to_period('M'))
+    # Each month's office days are spread over all of its workdays, not piled onto the same ones
+    assert (by_month.min() / by_month.max()).min() > 0.9
+    assert len(workdays) == OccupancyCalendar('2025-01-01', '2025-12-31', True).calendar.is_workday.sum()
+
+
+def test_each_employee_gets_their_office_days():
+    df = normalize_employees(employees(50, rto_percentage=np.linspace(0, 100, 50)))
+    calendar = OccupancyCalendar(pd.Timestamp('2025-01-01'), pd.Timestamp('2025-12-31'), True)
+    occupancy = calendar.occupancy(df, ())
+    placed = np.stack([np.bincount(calendar.month_ids, weights=row, minlength=12) for row in occupancy])
+    np.testing.assert_array_equal(placed, calendar.office_days(df))
+
+
+def test_preferred_weekdays_come_first():
+    headcount = forecast_headcount(employees(500, preferred_weekdays='Tue,Wed,Thu'))['default']
+    by_weekday = headcount.groupby(headcount.index.weekday).mean()
+    assert by_weekday[[1, 2, 3]].min() > by_weekday[[0, 4]].max()
+
+
+def test_parse_weekdays():
+    assert parse_weekdays('Tue, Wed;thursday') == (1, 2, 3)
+    assert parse_weekdays(None) == ()
+    with pytest.raises(ValueError, match='unknown weekday'):
+        parse_weekdays('Tue,Caturday')
+
+
+def test_capacity_report_flags_days_over_capacity():
+    headcount = pd.DataFrame({'NYC': [5, 12], 'SF': [5, 12]}, index=pd.to_datetime(['2025-01-06', '2025-01-07']))
+    daily, weekly = capacity_report(headcount, 10, {'SF': 20})
+    assert daily.loc[daily['Over Capacity'], ['Site', 'Headcount']].values.tolist() == [['NYC', 12]]
+    assert weekly.set_index('Site')['Days Over Capacity'].to_dict() == {'NYC': 1, 'SF': 0}
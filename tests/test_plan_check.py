@@ -0,0 +1,49 @@
+"""Reading and checking AI PTO plans in plan_check."""
+from datetime import date
+
+import pytest
+
+from plan_check import _parse_dates, check_plan, parse_plan
+from rto_core import PTO_SUBTRACTED, calculate_monthly_workdays
+
+
+@pytest.mark.parametrize('text, dates, spans', [
+    ("July 7, 8 and 9", [date(2025, 7, 7), date(2025, 7, 8), date(2025, 7, 9)], []),
+    ("Jan 6th & 7th", [date(2026, 1, 6), date(2026, 1, 7)], []),
+    ("2025-07-07 to 2025-07-09", [], [(date(2025, 7, 7), date(2025, 7, 9))]),
+    ("2025-07-07..2025-07-09, 2025-07-14", [date(2025, 7, 14)], [(date(2025, 7, 7), date(2025, 7, 9))]),
+    ("7/7, 7/8", [date(2025, 7, 7), date(2025, 7, 8)], []),
+    ("Thu Jul 3, Mon Jul 7 - Tue Jul 8 (extends the July 4th weekend)",
+     [date(2025, 7, 3)], [(date(2025, 7, 7), date(2025, 7, 8))]),
+    ("Jul 7-11", [], [(date(2025, 7, 7), date(2025, 7, 11))]),
+    ("Dec 30 - Jan 2", [], [(date(2025, 12, 30), date(2026, 1, 2))]),
+    ("July 7th, 2025", [date(2025, 7, 7)], []),
+    ("None", [], []),
+])
+def test_parse_dates(text, dates, spans):
+    assert _parse_dates(text, 2025, 7 if 'Jan' not in text else 12) == (dates, spans, [])
+
+
+def test_parse_dates_keeps_unread_text():
+    assert _parse_dates("Jul 7 and some beach days", 2025, 7) == ([date(2025, 7, 7)], [], ['some beach days'])
+
+
+def plan_check(text):
+    monthly_workdays = calculate_monthly_workdays('2025-07-01', '2025-07-31', False)
+    months = list(monthly_workdays)
+    return check_plan(parse_plan(text, months), monthly_workdays, 60, PTO_SUBTRACTED, False, 10)
+
+
+def test_check_plan_counts_every_date():
+    # July 2025 has 22 workdays (the 4th already excluded); 3 PTO days leave 19 -> floor(0.6 * 19) = 11
+    check = plan_check("- Month: July 2025\n - PTO Days: 3\n - Total required office days: 11\n"
+                       " - Dates to take: July 7, 8 and 9\n")
+    assert check['issues'] == []
+    assert check['total_pto'] == 3
+
+
+def test_check_plan_flags_unread_dates_and_missing_lines():
+    check = plan_check("- Month: July 2025\n - Dates to take: Jul 7, the week after\n")
+    assert not check['valid']
+    assert check['issues'] == ["Jul 2025: couldn't read 'the week after' as dates",
+                               "Jul 2025: no PTO Days line", "Jul 2025: no office days line"]
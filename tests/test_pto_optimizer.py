@@ -0,0 +1,53 @@
+"""The PTO planner in pto_optimizer against its rules and a brute force over monthly counts."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pto_optimizer import MAX_CONSECUTIVE_PTO, optimize_pto_plan
+from rto_core import PTO_ACCOUNTING_POLICIES, calculate_monthly_workdays, calculate_office_days, get_custom_holidays
+
+
+def fewest_office_days(monthly_workdays, pto_days, rto_percentage, policy):
+    """Lowest total office days over every split of the PTO across months (ignoring which dates)."""
+    workdays = list(monthly_workdays.values())
+    best = np.inf
+    for split in itertools.product(*(range(min(days, pto_days) + 1) for days in workdays)):
+        if sum(split) == pto_days:
+            _, office_days = calculate_office_days(np.array(workdays, dtype=float), np.array(split, dtype=float),
+                                                   rto_percentage, policy)
+            best = min(best, office_days.sum())
+    return best
+
+
+@pytest.mark.parametrize('policy', PTO_ACCOUNTING_POLICIES)
+@pytest.mark.parametrize('rto_percentage', [40, 60, 100])
+def test_plan_is_optimal_and_follows_the_rules(policy, rto_percentage):
+    start, end, pto_days = '2025-10-01', '2025-12-31', 7
+    plan = optimize_pto_plan(start, end, pto_days, rto_percentage, policy, True)
+    monthly_workdays = calculate_monthly_workdays(start, end, True)
+
+    assert len(plan['pto_dates']) == pto_days
+    assert sum(row['Office Days Required'] for row in plan['monthly_data']) == \
+        fewest_office_days(monthly_workdays, pto_days, rto_percentage, policy)
+
+    holidays = set(get_custom_holidays(start, end, True)['holiday_dates'])
+    days = pd.DatetimeIndex(plan['pto_dates'])
+    assert not any(day in holidays for day in days)
+    assert (days.weekday < 5).all()
+    assert not ((days.month == 12) & (days.day >= 24)).any()
+    # Never a full Monday-Friday week of PTO
+    assert pd.Series(1, index=days).groupby(days.to_period('W')).sum().max() <= MAX_CONSECUTIVE_PTO
+
+
+def test_planned_pto_is_counted_but_not_moved():
+    plan = optimize_pto_plan('2025-07-01', '2025-08-31', 2, 60, PTO_ACCOUNTING_POLICIES[0], True,
+                             planned_pto={'2025-07': 3.0})
+    assert plan['monthly_pto']['2025-07'] + plan['monthly_pto']['2025-08'] == 5
+    assert len(plan['pto_dates']) == 2
+
+
+def test_ten_years_of_pto():
+    plan = optimize_pto_plan('2025-01-01', '2034-12-31', 60, 60, PTO_ACCOUNTING_POLICIES[0], True)
+    assert len(plan['pto_dates']) == 60
@@ -0,0 +1,80 @@
+"""Parity of the vectorized workday counts with the original per-month loop."""
+from datetime import timedelta
+
+import holidays as hd
+import numpy as np
+import pandas as pd
+import pytest
+
+from rto_core import calculate_monthly_workdays, calculate_workdays
+
+
+def reference_holidays(start_date, end_date, extended_christmas_break):
+    """The app's original get_custom_holidays, for a range inside one year."""
+    start, end = pd.to_datetime(start_date), pd.to_datetime(end_date)
+    us_holidays = hd.US(years=range(start.year, end.year + 1))
+    federal_holidays = {date: name for date, name in us_holidays.items() if start <= pd.to_datetime(date) <= end}
+    additional_holidays = {}
+    year = start.year
+    thanksgiving = pd.to_datetime(pd.date_range(start=f"{year}-11-01", end=f"{year}-11-30", freq="W-THU")[3])
+    if start <= thanksgiving <= end:
+        additional_holidays[thanksgiving + timedelta(days=1)] = "Day After Thanksgiving"
+    if extended_christmas_break:
+        christmas_break = pd.date_range(start=f"{year}-12-24", end=f"{year}-12-31")
+        christmas_break = christmas_break[~christmas_break.weekday.isin([5, 6])]
+        christmas_break = christmas_break[~christmas_break.isin([pd.to_datetime(f'{year}-12-25')])]
+        for date in christmas_break:
+            if start <= date <= end:
+                additional_holidays[date] = "Christmas Break"
+    return pd.to_datetime(pd.Series(list({**federal_holidays, **additional_holidays})))
+
+
+def reference_workdays(start_date, end_date, extended_christmas_break):
+    """Original calculate_workdays, with holidays rebuilt for each (partial) month of the range."""
+    total = 0
+    for month in pd.period_range(start_date, end_date, freq='M'):
+        month_start = max(month.start_time, pd.Timestamp(start_date))
+        month_end = min(month.end_time.normalize(), pd.Timestamp(end_date))
+        holidays = reference_holidays(month_start, month_end, extended_christmas_break)
+        df = pd.DataFrame(index=pd.date_range(start=month_start, end=month_end))
+        total += df[~df.index.isin(holidays) & ~df.index.weekday.isin([5, 6])].shape[0]
+    return total
+
+
+def reference_monthly_workdays(start_date, end_date, extended_christmas_break):
+    """Original calculate_monthly_workdays: one calculate_workdays call per whole month."""
+    return {month.strftime('%Y-%m'): reference_workdays(month.replace(day=1), month, extended_christmas_break)
+            for month in pd.date_range(start=start_date, end=end_date, freq='ME')}
+
+
+FIXED_RANGES = [
+    ('2025-01-01', '2025-12-31'),
+    ('2024-11-15', '2025-02-10'),  # crosses a year boundary mid-month
+    ('2023-12-01', '2024-01-31'),
+    ('2025-03-10', '2025-03-20'),
+    ('2020-01-01', '2026-12-31'),
+    ('2025-02-28', '2025-03-01'),
+]
+
+
+def random_ranges(n=20, seed=0):
+    rng = np.random.default_rng(seed)
+    starts = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 15 * 365, n), unit='D')
+    lengths = pd.to_timedelta(rng.integers(0, 3 * 365, n), unit='D')
+    return [(f"{start:%Y-%m-%d}", f"{start + length:%Y-%m-%d}") for start, length in zip(starts, lengths)]
+
+
+@pytest.mark.parametrize('extended_christmas_break', [True, False])
+@pytest.mark.parametrize('start_date,end_date', FIXED_RANGES + random_ranges())
+def test_monthly_workdays_match_reference(start_date, end_date, extended_christmas_break):
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    assert (calculate_monthly_workdays(start, end, extended_christmas_break)
+            == reference_monthly_workdays(start, end, extended_christmas_break))
+
+
+@pytest.mark.parametrize('extended_christmas_break', [True, False])
+@pytest.mark.parametrize('start_date,end_date', FIXED_RANGES + random_ranges())
+def test_workdays_match_reference(start_date, end_date, extended_christmas_break):
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    assert calculate_workdays(start, end, extended_christmas_break) == reference_workdays(start, end,
+                                                                                          extended_christmas_break)